@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from typing import Any
+
+import aiohttp
+import discord
+import wavelink
+from wavelink.websocket import Websocket
+
+logger = logging.getLogger("discord")
+
+
+class _CritWebsocket(Websocket):
+    def __init__(self, *, node: wavelink.Node) -> None:
+        super().__init__(node=node)
+        # a strong reference, the event loop only keeps weak ones and it could disappear while reconnecting
+        self.reconnect_task: asyncio.Task[None] | None = None
+
+    # the stats event doesn't say which node sent it, the websocket knows
+    def dispatch(self, event: str, /, *args: Any, **kwargs: Any) -> None:
+        if event == "stats_update":
+            self.node.stats = args[0]
+        super().dispatch(event, *args, **kwargs)
+
+    async def connect(self) -> None:
+        # keep_alive calls this again when the connection is lost, while the node is still marked as connected
+        if self.node.status is wavelink.NodeStatus.CONNECTED:
+            self.dispatch("node_disconnected", self.node)
+        await super().connect()
+
+    async def keep_alive(self) -> None:
+        try:
+            await super().keep_alive()
+        except Exception as e:
+            # wavelink only reconnects when the socket is closed, an error (like a missed heartbeat) would end
+            # the task and leave the node marked as connected without a connection
+            logger.warning("The websocket of %r failed, reconnecting: %s", self.node, e)
+            self.reconnect_task = asyncio.create_task(self.connect())
+
+
+class CritNode(wavelink.Node):
+    """wavelink's Node but it keeps the last stats Lavalink sent, so the new players go to the least loaded node.
+
+    wavelink only looks at the number of players, a node with fewer players can still be the one with its cpu
+    maxed out or dropping frames. Lavalink sends the stats every minute.
+
+    When the connection to Lavalink is lost `on_wavelink_node_disconnected` is dispatched with the node,
+    wavelink keeps trying to reconnect but until then its players are silent.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats: wavelink.StatsEventPayload | None = None
+
+    async def _connect(self, *, client: discord.Client | None) -> None:
+        # the same as wavelink's but with our websocket
+        client_ = self._client or client
+
+        if not client_:
+            raise wavelink.InvalidClientException(
+                f"Unable to connect {self!r} as you have not provided a valid discord.Client."
+            )
+
+        self._client = client_
+
+        self._has_closed = False
+        if not self._session or self._session.closed:
+            self._session = aiohttp.ClientSession()
+
+        websocket = _CritWebsocket(node=self)
+        self._websocket = websocket
+        await websocket.connect()
+
+    @staticmethod
+    def calculate_penalty(
+        stats: wavelink.StatsEventPayload | None, players: int
+    ) -> float:
+        """How loaded a node is, the same penalties Lavalink's own clients use.
+
+        Args:
+            stats (wavelink.StatsEventPayload | None): The last stats of the node, None if it didn't send any yet.
+            players (int): How many of our players are in the node, the stats can be up to a minute old.
+
+        Returns:
+            float: The penalty, the node with the lowest one gets the next player.
+        """
+        if stats is None:
+            return float(players)
+
+        playing = stats.playing
+        # idle players barely cost anything
+        penalty = playing + (max(stats.players, players) - playing) * 0.25
+        # grows exponentially with the load, a node with its cpu maxed out is only picked if every node is like that
+        penalty += 1.05 ** (100 * stats.cpu.system_load) * 10 - 10
+        if stats.frames is not None:
+            # the frames are the average per player in the last minute, 3000 of them are sent when everything goes well
+            penalty += 1.03 ** (500 * stats.frames.deficit / 3000) * 600 - 600
+            penalty += (1.03 ** (500 * stats.frames.nulled / 3000) * 300 - 300) * 2
+        return penalty
+
+    @property
+    def penalty(self) -> float:
+        return self.calculate_penalty(self.stats, len(self.players))
+
+    @staticmethod
+    def best() -> wavelink.Node:
+        """The connected node with the lowest penalty.
+
+        Raises:
+            wavelink.InvalidNodeException: There is no node connected.
+        """
+        nodes = [
+            node
+            for node in wavelink.Pool.nodes.values()
+            if node.status is wavelink.NodeStatus.CONNECTED
+        ]
+        if not nodes:
+            raise wavelink.InvalidNodeException(
+                "No nodes are currently assigned to the wavelink.Pool in a CONNECTED state."
+            )
+        return min(
+            nodes,
+            key=lambda node: (
+                node.penalty if isinstance(node, CritNode) else len(node.players)
+            ),
+        )
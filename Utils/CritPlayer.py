@@ -0,0 +1,68 @@
+from typing import Callable
+
+import wavelink
+
+from .CritNode import CritNode
+from .TrackQueue import TrackQueue
+
+
+class CritPlayer(wavelink.Player):
+    """wavelink's Player but with our own queue, pass it as `cls` when connecting to a voice channel.
+
+    The player goes to the least loaded node, see CritNode.
+    `on_change` is called with the player when something that is saved in its snapshot changes (queue, volume, filters and autoplay).
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        if not kwargs.get("nodes"):
+            kwargs["nodes"] = [CritNode.best()]
+        super().__init__(*args, **kwargs)
+        self.on_change: Callable[["CritPlayer"], None] | None = None
+        # the members that aren't bots in the channel, kept up to date by the voice state updates
+        self.listeners = 0
+        self.queue: TrackQueue = TrackQueue(on_change=self.changed)
+
+    def changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change(self)
+
+    @wavelink.Player.autoplay.setter
+    def autoplay(self, value: wavelink.AutoPlayMode) -> None:
+        wavelink.Player.autoplay.fset(self, value)
+        self.changed()
+
+    async def set_volume(self, value: int = 100, /) -> None:
+        await super().set_volume(value)
+        self.changed()
+
+    async def set_filters(
+        self, filters: wavelink.Filters | None = None, /, *, seek: bool = False
+    ) -> None:
+        await super().set_filters(filters, seek=seek)
+        self.changed()
+
+    async def switch_node(self, node: wavelink.Node) -> None:
+        """Move the player to another node, e.g. when the connection to its node was lost.
+
+        The voice connection is handed to the new node and the current track continues there from where it was,
+        with the same volume, filters and pause state. The queue stays in the player, it isn't in Lavalink.
+
+        Args:
+            node (wavelink.Node): The node to move to.
+        """
+        assert self.guild is not None
+
+        position = self.position
+        previous = self._previous
+
+        self.node._players.pop(self.guild.id, None)
+        self._node = node
+        node._players[self.guild.id] = self
+
+        await self._dispatch_voice_update()
+
+        # the original has the extras of the track (requester, recommended, etc.)
+        track = self._original or self._current
+        if track is not None:
+            await self.play(track, start=position, add_history=False)
+            self._previous = previous
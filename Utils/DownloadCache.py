@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+
+import aiofiles.os
+
+
+class DownloadCache:
+    """Keeps the files of the download command on disk, so a track that was already downloaded (in any guild)
+    is sent again without extracting, downloading or converting it.
+
+    The files are named after the hash of (extractor, id, format), the same track in the same format is always the same file.
+    When the files use more than `budget` bytes the least recently used are deleted,
+    except the ones that are being sent (see `use`).
+    The downloads are written to `partial` first, what is left there from before a restart is deleted.
+    """
+
+    __slots__ = (
+        "directory",
+        "partial",
+        "budget",
+        "used",
+        "hits",
+        "misses",
+        "evictions",
+        "_files",
+        "_in_use",
+    )
+
+    def __init__(self, directory: str, budget: int = 2 * 1024 * 1024 * 1024) -> None:
+        """
+        Args:
+            directory (str): Where the files are kept, only the cache should write there.
+            budget (int, optional): How many bytes the files can use. Defaults to 2GiB.
+        """
+        self.directory = directory
+        self.partial = os.path.join(directory, "partial")
+        # the downloads that were cancelled or crashed, they aren't counted anywhere
+        shutil.rmtree(self.partial, ignore_errors=True)
+        self.budget = budget
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # hash of the key: (file name, size), the least recently used first
+        self._files: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        # hash of the key: how many are sending it or waiting to send it
+        self._in_use: dict[str, int] = {}
+
+    @staticmethod
+    def key(extractor: str, id: str, format: str) -> str:
+        return hashlib.sha256(f"{extractor}\0{id}\0{format}".encode()).hexdigest()
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    files.append((stat.st_atime, entry.name, stat.st_size))
+        return sorted(files)
+
+    async def load(self) -> None:
+        """Finds the files kept before a restart, the least recently accessed are the first to go."""
+        files = await asyncio.to_thread(self._scan)
+        self._files = OrderedDict(
+            (name.partition(".")[0], (name, size)) for _, name, size in files
+        )
+        self.used = sum(size for _, size in self._files.values())
+        await self._evict()
+
+    def __contains__(self, key: tuple[str, str, str]) -> bool:
+        """Whether (extractor, id, format) is cached, without counting it as a hit or a miss."""
+        return self.key(*key) in self._files
+
+    def get(self, extractor: str, id: str, format: str) -> str | None:
+        """The path of the file if it is cached."""
+        key = self.key(extractor, id, format)
+        file = self._files.get(key)
+        if file is None:
+            self.misses += 1
+            return None
+        self._files.move_to_end(key)
+        self.hits += 1
+        return os.path.join(self.directory, file[0])
+
+    async def add(self, path: str, extractor: str, id: str, format: str) -> str:
+        """Moves a downloaded file into the cache.
+
+        Returns:
+            str: Its new path.
+        """
+        key = self.key(extractor, id, format)
+        name = key + os.path.splitext(path)[1]
+        new_path = os.path.join(self.directory, name)
+        try:
+            size = await aiofiles.os.path.getsize(path)
+            await aiofiles.os.replace(path, new_path)
+        except FileNotFoundError:
+            # another download of the same track got here first
+            file = self._files.get(key)
+            if file is None:
+                raise
+            self._files.move_to_end(key)
+            return os.path.join(self.directory, file[0])
+
+        old = self._files.pop(key, None)
+        if old is not None:
+            self.used -= old[1]
+            if old[0] != name:
+                await aiofiles.os.remove(os.path.join(self.directory, old[0]))
+        self.used += size
+        self._files[key] = (name, size)
+        await self._evict(keep=key)
+        return new_path
+
+    def use(self, extractor: str, id: str, format: str) -> "_InUse":
+        """Keeps the file from being evicted while it is sent, `with cache.use(extractor, id, format): ...`.
+        It can be used before the file is added, so it is there once the download that is being waited for ends.
+        """
+        return _InUse(self, self.key(extractor, id, format))
+
+    async def _evict(self, keep: str | None = None) -> None:
+        evicted = []
+        for key, (name, size) in list(self._files.items()):
+            if self.used <= self.budget:
+                break
+            if key in self._in_use or key == keep:
+                continue
+            del self._files[key]
+            self.used -= size
+            self.evictions += 1
+            evicted.append(name)
+
+        for name in evicted:
+            try:
+                await aiofiles.os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """The counters of the cache, the sizes are in MiB."""
+        lookups = self.hits + self.misses
+        return {
+            "size": self.used // (1024 * 1024),
+            "max_size": self.budget // (1024 * 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": 0,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class _InUse:
+    __slots__ = ("cache", "key")
+
+    def __init__(self, cache: DownloadCache, key: str) -> None:
+        self.cache = cache
+        self.key = key
+
+    def __enter__(self) -> None:
+        in_use = self.cache._in_use
+        in_use[self.key] = in_use.get(self.key, 0) + 1
+
+    def __exit__(self, *_) -> None:
+        in_use = self.cache._in_use
+        in_use[self.key] -= 1
+        if not in_use[self.key]:
+            del in_use[self.key]
@@ -0,0 +1,163 @@
+import asyncio
+from collections import OrderedDict, deque
+
+
+class DownloadQueueFull(Exception):
+    pass
+
+
+class Reservation:
+    """Disk space reserved for one download, see DownloadManager."""
+
+    __slots__ = ("manager", "guild_id", "size", "admitted", "released", "_changed")
+
+    def __init__(self, manager: "DownloadManager", guild_id: int, size: int) -> None:
+        self.manager = manager
+        self.guild_id = guild_id
+        self.size = size
+        self.admitted = False
+        self.released = False
+        self._changed = asyncio.Event()
+
+    @property
+    def position(self) -> int:
+        """How many downloads will start before this one, 0 if it was admitted."""
+        return self.manager.position(self)
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Wait until the download is admitted or moves up in the queue.
+
+        Returns:
+            bool: Whether it was admitted.
+        """
+        if not self.admitted:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except TimeoutError:
+                pass
+            self._changed.clear()
+        return self.admitted
+
+    def written(self, size: int) -> None:
+        """The download finished and its file has `size` bytes, the estimate is replaced by it."""
+        if self.admitted and not self.released:
+            self.manager.resize(self, size)
+
+    def release(self) -> None:
+        """The file was deleted (or the download never started), its space can be used by the others."""
+        self.manager.release(self)
+
+
+class DownloadManager:
+    """Decides when a download can start, so all of them together never use more than `budget` bytes of disk.
+
+    The bytes are counted as they are reserved and written by our own downloads, there is no need to look at the disk.
+    The downloads that don't fit wait in a queue that takes turns between guilds,
+    a guild downloading a whole album doesn't make everyone else wait for it.
+    """
+
+    __slots__ = ("budget", "max_waiting", "used", "_waiting")
+
+    def __init__(self, budget: int = 1024 * 1024 * 1024, max_waiting: int = 32) -> None:
+        """
+        Args:
+            budget (int, optional): How many bytes the downloads can use at the same time. Defaults to 1GiB.
+            max_waiting (int, optional): How many downloads can wait for space, past that they are refused. Defaults to 32.
+        """
+        self.budget = budget
+        self.max_waiting = max_waiting
+        self.used = 0  # bytes of the admitted downloads
+        # guild id: its waiting downloads, the guild that goes next is the first one
+        self._waiting: OrderedDict[int, deque[Reservation]] = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(map(len, self._waiting.values()))
+
+    def reserve(self, guild_id: int, size: int) -> Reservation:
+        """Reserve `size` bytes for a download, check `admitted` and `wait` for it if it wasn't.
+
+        Raises:
+            DownloadQueueFull: There are too many downloads waiting or it is bigger than the whole budget.
+        """
+        if size > self.budget:
+            raise DownloadQueueFull(
+                f"The download needs {size} bytes but the budget is {self.budget}."
+            )
+
+        reservation = Reservation(self, guild_id, size)
+        if not self._waiting and self.used + size <= self.budget:
+            self.used += size
+            reservation.admitted = True
+            return reservation
+
+        if self.waiting >= self.max_waiting:
+            raise DownloadQueueFull(
+                f"There are already {self.waiting} downloads waiting."
+            )
+
+        self._waiting.setdefault(guild_id, deque()).append(reservation)
+        return reservation
+
+    def _order(self) -> list[Reservation]:
+        # the order they will be admitted in, one of each guild at a time
+        queues = [iter(queue) for queue in self._waiting.values()]
+        order = []
+        while queues:
+            for queue in queues.copy():
+                reservation = next(queue, None)
+                if reservation is None:
+                    queues.remove(queue)
+                else:
+                    order.append(reservation)
+        return order
+
+    def position(self, reservation: Reservation) -> int:
+        if reservation.admitted:
+            return 0
+        return self._order().index(reservation) + 1
+
+    def _admit(self) -> None:
+        admitted = False
+        while self._waiting:
+            guild_id, queue = next(iter(self._waiting.items()))
+            reservation = queue[0]
+            # the next one waits for space, the smaller ones behind it don't jump ahead or it could wait forever
+            if self.used + reservation.size > self.budget:
+                break
+
+            queue.popleft()
+            if queue:
+                self._waiting.move_to_end(guild_id)
+            else:
+                del self._waiting[guild_id]
+
+            self.used += reservation.size
+            reservation.admitted = True
+            admitted = True
+
+        if admitted:
+            # the ones still waiting moved up
+            for queue in self._waiting.values():
+                for reservation in queue:
+                    reservation._changed.set()
+
+    def resize(self, reservation: Reservation, size: int) -> None:
+        self.used += size - reservation.size
+        reservation.size = size
+        self._admit()
+
+    def release(self, reservation: Reservation) -> None:
+        if reservation.released:
+            return
+        reservation.released = True
+
+        if reservation.admitted:
+            self.used -= reservation.size
+        else:
+            queue = self._waiting[reservation.guild_id]
+            queue.remove(reservation)
+            if not queue:
+                del self._waiting[reservation.guild_id]
+        self._admit()
+        reservation._changed.set()
@@ -1,66 +1,143 @@
-import lxml.html
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+import lxml.etree
 
 
 class SongNotFound(Exception):
     pass
 
 
-class GeniusLyrics():
-    __slots__ = ("access_token", "session")
-    def __init__(self, access_token: str, session):
+class LyricsParser:
+    """Incremental parser of a genius.com song page.
+
+    The lyrics are near the top of the page and most of it is a huge preloaded state script,
+    so the chunks are fed as they arrive and `feed` says when the lyrics were closed and the rest can be skipped.
+    It is blocking, run it in an executor. lxml's parsers can't be shared between threads,
+    every call of the same parser has to be made from the same thread.
+    """
+
+    __slots__ = ("_parser", "_root", "lyrics", "done")
+
+    def __init__(self) -> None:
+        # only the divs matter, this skips the events of every other tag
+        self._parser = lxml.etree.HTMLPullParser(
+            events=("start", "end"), tag="div", encoding="utf-8"
+        )
+        self._root: lxml.etree._Element | None = None
+        self.lyrics: str | None = None
+        self.done = False
+
+    @staticmethod
+    def is_lyrics_root(element: lxml.etree._Element) -> bool:
+        class_name = element.get("class", "")
+        return "lyrics" in class_name or "Lyrics__Root" in class_name
+
+    @staticmethod
+    def extract(element: lxml.etree._Element) -> str | None:
+        for br in element.iter("br"):
+            br.tail = "\n" + br.tail if br.tail else "\n"
+
+        # the newer pages split the lyrics in containers and put the recommendations between them
+        containers = element.findall('.//div[@data-lyrics-container="true"]')
+        if containers:
+            lyrics = "\n".join(
+                "".join(container.itertext()) for container in containers
+            )
+            return lyrics.strip() or None
+
+        lyrics = "".join(element.itertext())
+
+        # the recommendations come after the lyrics and the header (title, contributors, etc.) before them
+        index = lyrics.find("You might also like")
+        if index != -1:
+            lyrics = lyrics[:index]
+        index = lyrics.find("Lyrics")
+        if index != -1:
+            lyrics = lyrics[index + 6 :]
+        return lyrics.strip() or None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse the next chunk of the page.
+
+        Returns:
+            bool: True if the lyrics were found and there is no need to read the rest of the page.
+        """
+        self._parser.feed(chunk)
+        for event, element in self._parser.read_events():
+            if event == "start":
+                # the first one is the outermost, like the first result of an xpath
+                if self._root is None and self.is_lyrics_root(element):
+                    self._root = element
+            elif element is self._root:
+                self.lyrics = self.extract(element)
+                self.done = True
+                break
+        return self.done
+
+    def close(self) -> str | None:
+        """Call this if the page ended before `feed` returned True."""
+        if not self.done:
+            self._parser.close()
+            if self._root is not None:
+                self.lyrics = self.extract(self._root)
+            self.done = True
+        return self.lyrics
+
+
+class GeniusLyrics:
+    __slots__ = ("access_token", "session", "_executor")
+
+    def __init__(self, access_token: str, session: aiohttp.ClientSession) -> None:
         self.access_token = access_token
         self.session = session
+        # a single thread, the default executor could run each chunk of the same parser in a different one
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="lyrics-parser"
+        )
 
     async def _get_path(self, query: str) -> str | None:
-
-        async with self.session.get(f"https://api.genius.com/search?q={query}&access_token={self.access_token}&per_page=1") as resp:
+        async with self.session.get(
+            "https://api.genius.com/search",
+            params={"q": query, "access_token": self.access_token, "per_page": 1},
+        ) as resp:
             json = await resp.json()
             try:
                 return json["response"]["hits"][0]["result"]["path"]
-            except IndexError:
+            except (IndexError, KeyError):
                 return None
 
-
-    async def _get_page(self, path: str) -> tuple[str, str]:
-        full_path = "https://genius.com" + path
-        async with self.session.get(full_path) as resp:
-            return (await resp.text(), full_path)
-    
-
     async def get_lyrics(self, query: str) -> tuple[str, str] | None:
+        """Search the song in genius.com and get its lyrics.
 
+        Args:
+            query (str): The song to search for.
 
+        Raises:
+            SongNotFound: The search had no results.
+
+        Returns:
+            tuple[str, str] | None: The lyrics and their url or None if the page had no lyrics.
+        """
         path = await self._get_path(query)
         if path is None:
             raise SongNotFound(f"Could not get {query} from genius.com.")
-        page, lyrics_url = await self._get_page(path)
-
-
-        tree = lxml.html.fromstring(page)
-        for br in tree.xpath("//br"):
-            br.tail = "\n" + br.tail if br.tail else "\n"
-        
-
-        div = tree.xpath('//div[contains(@class, "lyrics") or contains(@class, "Lyrics__Root")]')
-        if not div:
+        lyrics_url = "https://genius.com" + path
+
+        loop = asyncio.get_running_loop()
+        parser = LyricsParser()
+        async with self.session.get(lyrics_url) as resp:
+            async for chunk in resp.content.iter_chunked(65536):
+                # parsing the chunk blocks for a bit, keep it off the event loop
+                if await loop.run_in_executor(self._executor, parser.feed, chunk):
+                    break
+
+        lyrics = (
+            parser.lyrics
+            if parser.done
+            else await loop.run_in_executor(self._executor, parser.close)
+        )
+        if lyrics is None:
             return None
-            
-        lyrics = str(div[0].text_content())
-        lyrics = lyrics[1:-1] 
-
-        thing = "You might also like"
-        index = lyrics.find(thing)
-
-        lyrics = lyrics[:index]
-        index = lyrics.find("Lyrics")
-        lyrics = lyrics[index + 6:]
         return lyrics, lyrics_url
-
-
-
-        
-    
-    
-
-
-
@@ -0,0 +1,67 @@
+import zlib
+from typing import TYPE_CHECKING
+
+from lru import LRU
+
+if TYPE_CHECKING:
+    from bot import CritBot
+
+
+class LyricsCache:
+    """Caches the lyrics in memory and in the database, lyrics don't change so they never expire.
+
+    They are kept zlib compressed, lyrics are very repetitive and shrink to about a third,
+    so the same amount of memory holds about 3 times more songs.
+    """
+
+    __slots__ = ("bot", "_memory")
+
+    def __init__(self, bot: "CritBot", max_size: int = 256) -> None:
+        """
+        Args:
+            bot (CritBot): The bot, for its database pool.
+            max_size (int, optional): How many lyrics are kept in memory, the least recently used are dropped first. Defaults to 256.
+        """
+        self.bot = bot
+        # query: (compressed lyrics, url)
+        self._memory = LRU(max_size)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """`Never Gonna  Give you up` and `never gonna give you up` are the same search."""
+        return " ".join(query.lower().split())
+
+    async def get(self, query: str) -> tuple[str, str] | None:
+        """Get the cached lyrics of a search.
+
+        Returns:
+            tuple[str, str] | None: The lyrics and their url or None if they aren't cached.
+        """
+        key = self.normalize(query)
+        entry = self._memory.get(key)
+        if entry is None:
+            async with self.bot.db_pool.acquire() as conn:
+                record = await conn.fetchrow(
+                    "SELECT lyrics, url FROM lyrics WHERE query = $1;", key
+                )
+            if record is None:
+                return None
+            entry = self._memory[key] = (record["lyrics"], record["url"])
+
+        return zlib.decompress(entry[0]).decode(), entry[1]
+
+    async def set(self, query: str, lyrics: str, url: str) -> None:
+        key = self.normalize(query)
+        compressed = zlib.compress(lyrics.encode(), 9)
+        self._memory[key] = (compressed, url)
+
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO lyrics (query, lyrics, url) VALUES ($1, $2, $3)
+                ON CONFLICT (query) DO UPDATE SET lyrics = excluded.lyrics, url = excluded.url;
+                """,
+                key,
+                compressed,
+                url,
+            )
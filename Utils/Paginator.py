@@ -1,5 +1,8 @@
+from typing import Callable
+
 import discord
 from discord.ext import commands
+from lru import LRU
 
 
 class Simple(discord.ui.View):
@@ -19,6 +22,8 @@ class Simple(discord.ui.View):
         Page to start the pagination on.
     AllowExtInput: bool
         Overrides ability for 3rd party to interract with button.
+    CacheSize: int
+        How many pages made by a page factory are kept, the least recently viewed are made again if needed.
     """
 
     def __init__(self, *,
@@ -27,15 +32,18 @@ class Simple(discord.ui.View):
                 NextButton: discord.ui.Button = discord.ui.Button(emoji=discord.PartialEmoji(name="\U000025b6")),
                 PageCounterStyle: discord.ButtonStyle = discord.ButtonStyle.grey,
                 InitialPage: int = 0, AllowExtInput: bool = False,
-                ephemeral: bool = False) -> None:
+                ephemeral: bool = False, CacheSize: int = 8) -> None:
         self.PreviousButton = PreviousButton
         self.NextButton = NextButton
         self.PageCounterStyle = PageCounterStyle
         self.InitialPage = InitialPage
         self.AllowExtInput = AllowExtInput
         self.ephemeral = ephemeral
+        self.CacheSize = CacheSize
         
         self.pages = None
+        self.page_factory = None
+        self.page_count = None
         self.ctx = None
         self.message = None
         self.current_page = None
@@ -44,13 +52,24 @@ class Simple(discord.ui.View):
 
         super().__init__(timeout=timeout)
 
-    async def start(self, ctx: discord.Interaction | commands.Context, pages: list[discord.Embed]):
+    async def start(self, ctx: discord.Interaction | commands.Context, pages: list[discord.Embed] | None = None, *,
+                    page_count: int | Callable[[], int] | None = None, page_factory: Callable[[int], discord.Embed] | None = None):
+        """Either pass all the `pages` or a `page_count` and a `page_factory` that makes the page with the given index,
+        with the factory only the pages that are viewed are made.
+        When what is paginated can change (e.g. a queue) `page_count` can be a function, it is called again before a page is shown.
+        """
         
         if isinstance(ctx, discord.Interaction):
             ctx = await commands.Context.from_interaction(ctx)
 
-        self.pages = pages
-        self.total_page_count = len(pages)
+        if pages is not None:
+            self.pages = pages
+            self.total_page_count = len(pages)
+        else:
+            self.pages = LRU(self.CacheSize)
+            self.page_factory = page_factory
+            self.page_count = page_count
+            self.total_page_count = page_count() if callable(page_count) else page_count
         self.ctx = ctx
         self.current_page = self.InitialPage
 
@@ -64,28 +83,50 @@ class Simple(discord.ui.View):
         self.add_item(self.PreviousButton)
         self.add_item(self.page_counter)
         self.add_item(self.NextButton)
-        if len(pages) == 1:
-            self.message = await ctx.send(embed=self.pages[self.InitialPage], ephemeral=self.ephemeral)
+        if self.total_page_count == 1:
+            self.message = await ctx.send(embed=self.get_page(self.InitialPage), ephemeral=self.ephemeral)
         else:
-            self.message = await ctx.send(embed=self.pages[self.InitialPage], view=self, ephemeral=self.ephemeral)
+            self.message = await ctx.send(embed=self.get_page(self.InitialPage), view=self, ephemeral=self.ephemeral)
+
+    def get_page(self, index: int) -> discord.Embed:
+        if self.page_factory is None:
+            return self.pages[index]
+
+        page = self.pages.get(index)
+        if page is None:
+            page = self.pages[index] = self.page_factory(index)
+        return page
+
+    def update_page_count(self) -> None:
+        if not callable(self.page_count):
+            return
+
+        total_page_count = max(1, self.page_count())
+        if total_page_count != self.total_page_count:
+            # the pages that were made are from before the change
+            self.pages.clear()
+            self.total_page_count = total_page_count
+            self.current_page = min(self.current_page, total_page_count - 1)
 
     async def previous(self):
+        self.update_page_count()
         if self.current_page == 0:
             self.current_page = self.total_page_count - 1
         else:
             self.current_page -= 1
 
         self.page_counter.label = f"{self.current_page + 1}/{self.total_page_count}"
-        await self.message.edit(embed=self.pages[self.current_page], view=self)
+        await self.message.edit(embed=self.get_page(self.current_page), view=self)
 
     async def next(self):
+        self.update_page_count()
         if self.current_page == self.total_page_count - 1:
             self.current_page = 0
         else:
             self.current_page += 1
 
         self.page_counter.label = f"{self.current_page + 1}/{self.total_page_count}"
-        await self.message.edit(embed=self.pages[self.current_page], view=self)
+        await self.message.edit(embed=self.get_page(self.current_page), view=self)
 
     async def next_button_callback(self, interaction: discord.Interaction):
         if interaction.user != self.ctx.author and self.AllowExtInput:
@@ -0,0 +1,173 @@
+from typing import TYPE_CHECKING, Any, Iterable
+
+import discord
+import orjson
+
+from .CritPlayer import CritPlayer
+from .QueuedTrack import QueuedTrack
+
+if TYPE_CHECKING:
+    import asyncpg
+
+    from bot import CritBot
+
+
+class RestoredContext:
+    """Stands in for the context of the command that started a player that was restored after a restart.
+
+    The player only uses its context to send messages and to know who asked for a track.
+    """
+
+    __slots__ = ("bot", "guild", "channel", "author")
+
+    def __init__(self, bot: "CritBot", channel: discord.abc.Messageable) -> None:
+        self.bot = bot
+        self.guild: discord.Guild = channel.guild
+        self.channel = channel
+        # the tracks without a requester are shown as requested by the bot
+        self.author: discord.Member = channel.guild.me
+
+    async def send(self, *args, **kwargs) -> discord.Message:
+        return await self.channel.send(*args, **kwargs)
+
+
+class QueueStore:
+    """Saves the state of the players (queue, current track and where it was, autoplay, filters and volume) in the database,
+    so they can continue where they stopped after the bot restarts.
+
+    A player changes a lot (every track that starts, every song added, etc.) so changes only mark it,
+    `save` writes the marked players all at once and a player that changed 50 times since the last save is written once.
+    """
+
+    __slots__ = ("bot", "_dirty")
+
+    def __init__(self, bot: "CritBot") -> None:
+        self.bot = bot
+        # guild id: player
+        self._dirty: dict[int, CritPlayer] = {}
+
+    def mark(self, player: CritPlayer) -> None:
+        """Mark the player to be saved on the next `save`, this is the `on_change` of the players."""
+        if player.guild is not None:
+            self._dirty[player.guild.id] = player
+
+    @staticmethod
+    def _track(track: QueuedTrack) -> tuple[str, int | None, dict[str, Any] | None]:
+        return track.encoded, track.requester_id, track.plugin_info
+
+    @classmethod
+    def snapshot(cls, player: CritPlayer) -> tuple:
+        """The row of the player in the `queue_snapshots` table."""
+        current = player.current
+        return (
+            player.guild.id,
+            player.channel.id,
+            player.ctx.channel.id,
+            orjson.dumps(cls._track(QueuedTrack.from_playable(current))).decode()
+            if current
+            else None,
+            player.position if current else 0,
+            orjson.dumps(list(map(cls._track, player.queue.records()))).decode(),
+            player.autoplay.value,
+            orjson.dumps(player.filters()).decode(),
+            player.volume,
+        )
+
+    async def save(self, playing: Iterable[CritPlayer] = ()) -> None:
+        """Write the marked players to the database.
+
+        Args:
+            playing (Iterable[CritPlayer], optional): Players whose position should be updated even if nothing else changed,
+                without it a crash would restart their tracks from where they were on the last change. Defaults to ().
+        """
+        dirty, self._dirty = self._dirty, {}
+        snapshots: list[tuple] = []
+        stopped: list[tuple[int]] = []
+        for guild_id, player in dirty.items():
+            # there is nothing to continue, players only get a context when something is played
+            if (
+                not player.connected
+                or getattr(player, "ctx", None) is None
+                or not (player.current or player.queue)
+            ):
+                stopped.append((guild_id,))
+            else:
+                snapshots.append(self.snapshot(player))
+
+        positions = [
+            (player.guild.id, player.position)
+            for player in playing
+            if player.guild is not None
+            and player.guild.id not in dirty
+            and player.current
+        ]
+
+        if not (snapshots or stopped or positions):
+            return
+
+        try:
+            await self._write(snapshots, stopped, positions)
+        except BaseException:
+            # they are saved on the next try, unless they changed again in the meantime
+            self._dirty = dirty | self._dirty
+            raise
+
+    async def _write(
+        self,
+        snapshots: list[tuple],
+        stopped: list[tuple[int]],
+        positions: list[tuple[int, int]],
+    ) -> None:
+        async with self.bot.db_pool.acquire() as conn:
+            async with conn.transaction():
+                if snapshots:
+                    await conn.executemany(
+                        """
+                        INSERT INTO queue_snapshots (guild_id, channel_id, text_channel_id, current, position, tracks, autoplay, filters, volume)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+                        ON CONFLICT (guild_id) DO UPDATE SET channel_id = excluded.channel_id, text_channel_id = excluded.text_channel_id,
+                        current = excluded.current, position = excluded.position, tracks = excluded.tracks, autoplay = excluded.autoplay,
+                        filters = excluded.filters, volume = excluded.volume, updated_at = NOW();
+                        """,
+                        snapshots,
+                    )
+                if stopped:
+                    await conn.executemany(
+                        "DELETE FROM queue_snapshots WHERE guild_id = $1;", stopped
+                    )
+                if positions:
+                    await conn.executemany(
+                        "UPDATE queue_snapshots SET position = $2, updated_at = NOW() WHERE guild_id = $1;",
+                        positions,
+                    )
+
+    async def load(self) -> list["asyncpg.Record"]:
+        """Get every saved player."""
+        async with self.bot.db_pool.acquire() as conn:
+            return await conn.fetch("SELECT * FROM queue_snapshots;")
+
+    async def delete(self, guild_id: int) -> None:
+        self._dirty.pop(guild_id, None)
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM queue_snapshots WHERE guild_id = $1;", guild_id
+            )
+
+    @staticmethod
+    def _restore_track(data: list) -> QueuedTrack:
+        return QueuedTrack.from_encoded(*data)
+
+    @classmethod
+    def restore_tracks(
+        cls, record: "asyncpg.Record"
+    ) -> tuple[QueuedTrack | None, list[QueuedTrack]]:
+        """Turn the tracks saved by `snapshot` back into QueuedTracks.
+
+        Returns:
+            tuple[QueuedTrack | None, list[QueuedTrack]]: The current track, if there was one, and the queue.
+        """
+        current = record["current"]
+        return (
+            cls._restore_track(orjson.loads(current)) if current else None,
+            list(map(cls._restore_track, orjson.loads(record["tracks"]))),
+        )
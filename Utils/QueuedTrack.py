@@ -0,0 +1,160 @@
+import base64
+from typing import Any
+
+import wavelink
+
+
+class QueuedTrack:
+    """A track waiting in a queue.
+
+    A Playable keeps the whole Lavalink payload around, its album, artist and extras objects
+    and the context we used to attach to it, which adds up with playlists of thousands of tracks.
+    This keeps only the encoded track, everything else Lavalink knows about it is decoded from it when it is needed again.
+    """
+
+    __slots__ = (
+        "encoded",
+        "title",
+        "length",
+        "is_stream",
+        "requester_id",
+        "plugin_info",
+    )
+
+    def __init__(
+        self,
+        encoded: str,
+        title: str,
+        length: int,
+        is_stream: bool,
+        requester_id: int | None = None,
+        plugin_info: dict[str, Any] | None = None,
+    ) -> None:
+        self.encoded = encoded
+        self.title = title
+        self.length = length
+        self.is_stream = is_stream
+        self.requester_id = requester_id
+        # the extra info of plugins like LavaSrc (artist url, album, etc.), it isn't in the encoded track
+        self.plugin_info = plugin_info
+
+    @classmethod
+    def from_playable(
+        cls, track: wavelink.Playable, requester_id: int | None = None
+    ) -> "QueuedTrack":
+        return cls(
+            track.encoded,
+            track.title,
+            track.length,
+            track.is_stream,
+            requester_id or getattr(track.extras, "requester_id", None),
+            # empty dicts would take more memory than None
+            track.raw_data.get("pluginInfo") or None,
+        )
+
+    @classmethod
+    def from_encoded(
+        cls,
+        encoded: str,
+        requester_id: int | None = None,
+        plugin_info: dict[str, Any] | None = None,
+    ) -> "QueuedTrack":
+        info = cls.decode_info(encoded)
+        return cls(
+            encoded,
+            info["title"],
+            info["length"],
+            info["isStream"],
+            requester_id,
+            plugin_info,
+        )
+
+    @staticmethod
+    def _read_utf(data: bytes, pos: int) -> tuple[str, int]:
+        # java's DataOutput.writeUTF, 2 bytes with the length and then "modified" UTF-8
+        end = pos + 2 + int.from_bytes(data[pos : pos + 2])
+        value = data[pos + 2 : end]
+        if b"\xed" in value:
+            # characters outside of the BMP (e.g. emojis) are written as two encoded surrogates
+            return value.decode("utf-8", "surrogatepass").encode(
+                "utf-16", "surrogatepass"
+            ).decode("utf-16"), end
+        return value.decode(), end
+
+    @classmethod
+    def _read_nullable_utf(cls, data: bytes, pos: int) -> tuple[str | None, int]:
+        if not data[pos]:
+            return None, pos + 1
+        return cls._read_utf(data, pos + 1)
+
+    @classmethod
+    def decode_info(cls, encoded: str) -> dict[str, Any]:
+        """Decodes the info of a track from its encoded string, like Lavalink's `/v4/decodetrack` but without the request.
+
+        Args:
+            encoded (str): The encoded track.
+
+        Returns:
+            dict[str, Any]: The same info Lavalink sends with a track.
+        """
+        data = base64.b64decode(encoded)
+
+        # the first 4 bytes are the flags (2 bits) and the size of the message, if the first flag is set the version follows
+        pos = 4
+        version = 1
+        if data[0] >> 6 & 1:
+            version = data[4]
+            pos = 5
+
+        title, pos = cls._read_utf(data, pos)
+        author, pos = cls._read_utf(data, pos)
+        length = int.from_bytes(data[pos : pos + 8], signed=True)
+        identifier, pos = cls._read_utf(data, pos + 8)
+        is_stream = data[pos] != 0
+        pos += 1
+
+        uri = artwork_url = isrc = None
+        if version >= 2:
+            uri, pos = cls._read_nullable_utf(data, pos)
+        if version >= 3:
+            artwork_url, pos = cls._read_nullable_utf(data, pos)
+            isrc, pos = cls._read_nullable_utf(data, pos)
+        source_name, pos = cls._read_utf(data, pos)
+
+        return {
+            "identifier": identifier,
+            "isSeekable": not is_stream,
+            "author": author,
+            "length": length,
+            "isStream": is_stream,
+            # the data of the source comes before the position, so it is read from the end
+            "position": int.from_bytes(data[-8:], signed=True),
+            "title": title,
+            "uri": uri,
+            "artworkUrl": artwork_url,
+            "isrc": isrc,
+            "sourceName": source_name,
+        }
+
+    def to_playable(self) -> wavelink.Playable:
+        return wavelink.Playable(
+            {
+                "encoded": self.encoded,
+                "info": self.decode_info(self.encoded),
+                "pluginInfo": self.plugin_info or {},
+                "userData": {"requester_id": self.requester_id}
+                if self.requester_id
+                else {},
+            }
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (QueuedTrack, wavelink.Playable)):
+            return self.encoded == other.encoded
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.encoded)
+
+    def __repr__(self) -> str:
+        return f"QueuedTrack(title={self.title!r}, requester_id={self.requester_id})"
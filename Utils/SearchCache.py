@@ -0,0 +1,102 @@
+import urllib.parse
+
+import wavelink
+
+from .SingleFlight import SingleFlight
+from .TTLCache import TTLCache
+
+
+class SearchCache:
+    """Caches the results of `wavelink.Playable.search`, so a song that was searched a few minutes ago
+    (in any guild) doesn't need another round trip to Lavalink.
+
+    The queries are normalized first, `Never Gonna Give You Up` and `never gonna  give you up` are the same search
+    and so are `https://youtu.be/dQw4w9WgXcQ?si=...` and `https://www.youtube.com/watch?v=dQw4w9WgXcQ`.
+    Identical searches that run at the same time are only sent once.
+    """
+
+    __slots__ = ("_cache", "_inflight")
+
+    # tracking and sharing parameters, they don't change what the url points to
+    ignored_params = frozenset(("si", "feature", "pp", "ab_channel", "context"))
+    # the hosts that are the same site, e.g. youtu.be/<id> is youtube.com/watch?v=<id>
+    host_aliases = {
+        "m.youtube.com": "youtube.com",
+        "youtu.be": "youtube.com",
+        "m.soundcloud.com": "soundcloud.com",
+    }
+
+    def __init__(self, max_size: int = 512, ttl: float = 30 * 60) -> None:
+        """
+        Args:
+            max_size (int, optional): How many searches are kept, the least recently used are dropped first. Defaults to 512.
+            ttl (float, optional): How long the results are kept, in seconds. Defaults to 30 minutes.
+        """
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._inflight = SingleFlight()
+
+    @classmethod
+    def normalize_url(cls, url: str) -> str:
+        parts = urllib.parse.urlsplit(url)
+        host = parts.hostname or ""
+        host = host.removeprefix("www.")
+        path = parts.path.rstrip("/")
+        params = [
+            (key, value)
+            for key, value in urllib.parse.parse_qsl(parts.query)
+            if key not in cls.ignored_params and not key.startswith("utm_")
+        ]
+
+        if host == "youtu.be":
+            params.append(("v", path.lstrip("/")))
+            path = "/watch"
+        elif host == "open.spotify.com" and path.startswith("/intl-"):
+            # /intl-pt/track/<id> is /track/<id> in portuguese
+            path = path[path.find("/", 1) :]
+
+        host = cls.host_aliases.get(host, host)
+        if parts.port:
+            host += f":{parts.port}"
+        query = urllib.parse.urlencode(sorted(params))
+        return urllib.parse.urlunsplit(("https", host, path, query, ""))
+
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        query = query.strip().strip("<>")
+        if query.startswith(("http://", "https://")):
+            return cls.normalize_url(query)
+        if "://" in query:
+            # other sources (e.g. ftts://) are passed as is, their case can matter
+            return query
+        return " ".join(query.casefold().split())
+
+    def __contains__(self, query: str) -> bool:
+        """Whether the results of the query are cached, without counting it as a hit or a miss."""
+        return self.normalize(query) in self._cache
+
+    def prime(self, tracks: list[wavelink.Playable]) -> None:
+        """Cache every track as the result of searching its own url.
+        The results of a text search are often picked and played by their url right after.
+        """
+        for track in tracks:
+            if track.uri:
+                self._cache.set(self.normalize(track.uri), [track])
+
+    async def search(self, query: str) -> wavelink.Search:
+        """The same as `wavelink.Playable.search(query)` but cached.
+
+        The results are shared between every caller, copy the tracks before changing them.
+        """
+        key = self.normalize(query)
+        tracks = self._cache.get(key)
+        if tracks is None:
+            tracks = await self._inflight.do(key, wavelink.Playable.search, query)
+            # nothing found can be a hiccup of the source, don't keep it
+            if tracks:
+                self._cache.set(key, tracks)
+        return tracks
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """The counters of the cache, its hit ratio and how many searches were coalesced with an identical one."""
+        return {**self._cache.stats, "coalesced": self._inflight.coalesced}
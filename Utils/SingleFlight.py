@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key, so that only one of them does the actual work
+    and every caller awaits its result.
+
+    Nothing is cached, once the call finishes the next one with the same key runs again.
+    """
+
+    __slots__ = ("_in_flight", "coalesced")
+
+    def __init__(self) -> None:
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.coalesced = 0  # how many calls didn't have to run because an identical one was already running
+
+    def __done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def do(
+        self, key: Hashable, func: Callable[..., Awaitable[Any]], *args
+    ) -> Any:
+        """Run `func(*args)` unless a call with the same key is already running, in that case wait for it instead.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            func (Callable[..., Awaitable[Any]]): The coroutine function to run.
+
+        Returns:
+            Any: What `func` returned, the exceptions it raised are raised to every caller.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(func(*args))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self.__done(key, t))
+        else:
+            self.coalesced += 1
+
+        # a caller giving up (e.g. a cancelled command) must not cancel the call for the others
+        return await asyncio.shield(task)
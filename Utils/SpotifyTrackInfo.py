@@ -1,5 +1,13 @@
-import lxml.html
+import asyncio
+import re
+import time
+
 import aiohttp
+import orjson
+
+from .SingleFlight import SingleFlight
+from .StreamScanner import StreamScanner
+from .TTLCache import TTLCache
 
 
 class SpotifyTrackInfo:
@@ -7,134 +15,119 @@ class SpotifyTrackInfo:
 
     It is a reverse-engineering of the Spotify website and API.
     This is because the official Spotify API doesn't provide the monthly listeners of an artist nor the total play count of a track.
+    Both responses are huge, they are scanned while they are being read and the connection is dropped as soon as every field was found.
     """
 
-    __slots__ = ("session", "artist_url", "api_partner_url")
+    __slots__ = (
+        "session",
+        "artist_url",
+        "api_partner_url",
+        "token_url",
+        "inflight",
+        "access_token",
+        "token_expires_at",
+        "monthly_listeners",
+    )
+
+    # the fields are found by what is around them instead of where they are, so the pages can change a bit without breaking this
+    artist_page_patterns = {
+        # <meta property="og:description" content="Artist · 62.5M monthly listeners."/>
+        "monthly_listeners": re.compile(rb"\xc2\xb7 ([\d.,]+[KMB]?) monthly listeners"),
+        # <script id="session" ...>{"accessToken":"...","accessTokenExpirationTimestampMs":...,"isAnonymous":true,"clientId":"..."}</script>
+        "access_token": re.compile(rb'"accessToken":"([^"]+)"'),
+        "token_expires_at": re.compile(rb'"accessTokenExpirationTimestampMs":(\d+)'),
+    }
+    # the meta tags and the session script are near the top, the rest of the page is useless to us
+    artist_page_max_bytes = 256 * 1024
+    track_patterns = {
+        "content_rating": re.compile(rb'"contentRating":\{"label":"(\w+)"'),
+        "playcount": re.compile(rb'"playcount":"(\d+)"'),
+        # the release date of the album, the first isoString of the response
+        "release_date": re.compile(rb'"isoString":"(\d{4})-(\d{2})-(\d{2})T'),
+    }
+    track_max_bytes = 64 * 1024
 
     def __init__(self, session: aiohttp.ClientSession) -> None:
         self.session = session
         self.artist_url = "https://open.spotify.com/artist/{artist_id}"
         self.api_partner_url = 'https://api-partner.spotify.com/pathfinder/v1/query?operationName=getTrack&variables={{"uri":"spotify:track:{spotify_track}"}}&extensions={{"persistedQuery":{{"version":1,"sha256Hash":"ae85b52abb74d20a4c331d4143d4772c95f34757bfa8c625474b912b9055b5c0"}}}}'
+        self.token_url = "https://open.spotify.com/get_access_token?reason=transport&productType=web_player"
+        self.inflight = SingleFlight()
 
-    async def __get_artist_page(self, artist_id: str) -> bytes:
-        """Fetches the artist page from Spotify. This page is huge, we only need the first 32768 bytes.
-        The monthly listeners are in beggining of the page and the access token is in the 26000+ bytes of the page.
+        # the anonymous token is the same for every request until it expires
+        self.access_token: str | None = None
+        self.token_expires_at = 0.0
+        # artist_id: monthly listeners
+        self.monthly_listeners = TTLCache(max_size=1024, ttl=6 * 60 * 60)
 
-        Args:
-            artist_id (str): The Spotify artist ID.
+    async def __scan(
+        self,
+        url: str,
+        patterns: dict[str, re.Pattern[bytes]],
+        max_bytes: int,
+        headers: dict[str, str] | None = None,
+    ) -> dict[str, str]:
+        """Reads the response only until every pattern was found or `max_bytes` were read."""
+        scanner = StreamScanner(patterns)
+        async with self.session.get(url, headers=headers) as resp:
+            await scanner.scan(resp.content.iter_chunked(4096), max_bytes)
+        return scanner.found
+
+    @staticmethod
+    def parse_artist_page(found: dict[str, str]) -> tuple[str | None, float, str]:
+        """Converts the scanned fields of the artist page.
 
         Returns:
-            bytes: The first 32768 bytes of the response.
+            tuple[str | None, float, str]: The access token (None if it wasn't found), its expiration in seconds and the monthly listeners.
         """
-        url = self.artist_url.format(artist_id=artist_id)
-        async with self.session.get(url) as resp:
-            # The access_token is in the 26000+ bytes
-            data = bytearray()
-            async for chunk in resp.content.iter_chunked(1024):
-                data.extend(chunk)
-                if len(data) >= 32768:
-                    return bytes(data)
-
-    def __parse_partial_artist_page(self, data: bytes) -> tuple[str, str]:
-        monthly_listeners = []
-        current = 1700  # 1700 is approximately a good index to start looking for the monthly listeners
-
-        # doing this is almost 3 times faster than using lxml
-        while True:
-            if data[current] == 183:  # 183 is the ascii code for ·
-                current += 2
-                while (
-                    data[current] != 32
-                ):  # 32 is the ascii code for space, meaning the monthly listeners are over
-                    monthly_listeners.append(chr(data[current]))
-                    current += 1
-                break
-            current += 1
-        monthly_listeners = "".join(monthly_listeners)
-
-        html = lxml.html.fromstring(
-            data[26000:]
-        )  # the token is in the 26000+ bytes so we can skip the first 26000 bytes
-
-        script_content = html.xpath('//script[@id="session"]')[0].text_content()
-
-        # The token is 115 chars long and ignore the first 16 chars because they are the '{"accessToken":"' part
-        access_token = script_content[16:131]
-
-        return access_token, monthly_listeners
-
-    async def __get_track_info(
-        self,
-        spotify_track: str,
-        bearer_token: str,
-    ) -> bytes:
-        """Fetches the track info from the Spotify API. Usually this payload is huge, but we only need approximately the first 900 bytes. Im still getting the first 1024 just to be sure that songs with long titles are covered.
+        return (
+            found.get("access_token"),
+            int(found.get("token_expires_at", 0)) / 1000,
+            found.get("monthly_listeners", "N/A"),
+        )
 
-        Args:
-            spotify_track (str): The Spotify track ID.
-            bearer_token (str): The Spotify access token.
+    def __set_token(self, access_token: str, expires_at: float) -> None:
+        self.access_token = access_token
+        # renew it a bit earlier, so it doesn't expire mid request
+        self.token_expires_at = expires_at - 60
 
-        Returns:
-            bytes: The first 1024 bytes of the response.
-        """
-        url = self.api_partner_url.format(spotify_track=spotify_track)
-        async with self.session.get(
-            url, headers={"authorization": f"Bearer {bearer_token}"}
-        ) as resp:
-            return await resp.content.read(1024)
+    async def __fetch_token(self) -> str:
+        """Fetches only the anonymous access token, this is a lot smaller than the artist page."""
+        async with self.session.get(self.token_url) as resp:
+            resp.raise_for_status()
+            session = await resp.json(loads=orjson.loads)
 
-    def __parse_partial_response(self, data: bytes) -> tuple[str, str, bool]:
-        """Parses the partial response from the Spotify API.
+        self.__set_token(
+            session["accessToken"], session["accessTokenExpirationTimestampMs"] / 1000
+        )
+        return self.access_token
 
-        Args:
-            data (bytes): The first 1024 bytes of the response.
+    async def __get_token(self) -> str:
+        if self.access_token and time.time() < self.token_expires_at:
+            return self.access_token
+        return await self.inflight.do("token", self.__fetch_token)
+
+    @staticmethod
+    def parse_track_response(found: dict[str, str]) -> tuple[str, str, bool | None]:
+        """Converts the scanned fields of the getTrack response.
 
         Returns:
-            tuple[str, str, bool]: The playcount, release date and content rating. The content rating is a boolean. True if the track is explicit, False if it's not and None if it's unknown.
+            tuple[str, str, bool | None]: The playcount, release date and content rating. The content rating is a boolean. True if the track is explicit, False if it's not and None if it's unknown.
         """
-        explicit = data[70] == 69  # 69 is the ascii code for E (EXPLICIT)
-
-        playcount = []
-        date = []
-        current = 159  # 159 is the index of the first byte of the name which is the first "dynamic" field
-        done_playcount = False
-        while True:
-            if (
-                data[current] == 123 and not done_playcount
-            ):  # 123 is the ascii for '{', the playcount is 51 bytes after the first left bracket
-                current += 51
-
-                while data[current] != 34:  # while the byte is not a double quote
-                    playcount.append(chr(data[current]))
-                    current += 1
-
-                current += 266  # 266 is the max number of "static" bytes between the playcount and the release date this puts the index at the first byte of the copyright text
-                done_playcount = True
-
-            if (
-                data[current] == 90
-                and data[current - 3] == 58
-                and data[current - 9] == 84
-                and data[current - 6] == 58
-            ):
-                # check if the byte is Z, the byte 3 bytes before is :, the byte 9 bytes before is T and the byte 6 bytes before is :
-                # this is good indicator this is the timestamp
-                current -= 19  # the Z represents the end of the timestamp, so we go back 19 bytes to get the full date
-                for _ in range(10):  # only get the date not the time
-                    date.append(chr(data[current]))
-                    current += 1
-                break
-            current += 1
-
-        playcount = "".join(playcount)
-        release_date = "".join(date)
-        release_date = f"{release_date[8:10]}-{release_date[5:7]}-{release_date[:4]}"  # format the date to dd-mm-yyyy
-
-        return playcount, release_date, explicit
+        release_date = found.get("release_date")  # YYYYMMDD
+        if release_date:
+            release_date = f"{release_date[6:]}-{release_date[4:6]}-{release_date[:4]}"  # format the date to dd-mm-yyyy
+
+        content_rating = found.get("content_rating")
+        return (
+            found.get("playcount", "N/A"),
+            release_date or "N/A",
+            None if content_rating is None else content_rating == "EXPLICIT",
+        )
 
     async def get_info(
         self, artist_id: str, spotify_track: str
-    ) -> tuple[str, str, str, bool]:
+    ) -> tuple[str, str, str, bool | None]:
         """Get the monthly listeners, playcount, release date and content rating of a Spotify track.
 
         Args:
@@ -144,16 +137,46 @@ class SpotifyTrackInfo:
         Returns:
             tuple[str, str, str, bool]: The monthly listeners, playcount, release date and content rating. The content rating is a boolean. True if the track is explicit, False if it's not and None if it's unknown.
         """
-        artist_page = await self.__get_artist_page(artist_id)
-
-        bearer_token, monthly_listeners = self.__parse_partial_artist_page(artist_page)
-        response = await self.__get_track_info(spotify_track, bearer_token)
+        return await self.inflight.do(
+            spotify_track, self.__fetch_info, artist_id, spotify_track
+        )
 
-        return (
-            monthly_listeners,
-            *self.__parse_partial_response(response),
+    async def __fetch_info(
+        self, artist_id: str, spotify_track: str
+    ) -> tuple[str, str, str, bool | None]:
+        monthly_listeners = self.monthly_listeners.get(artist_id)
+        if monthly_listeners is None:
+            # the artist page also has a token, so a missing or expired token doesn't cost another request
+            access_token, expires_at, monthly_listeners = self.parse_artist_page(
+                await self.__scan(
+                    self.artist_url.format(artist_id=artist_id),
+                    self.artist_page_patterns,
+                    self.artist_page_max_bytes,
+                )
+            )
+            # a failed scan is only kept for a minute, so a hiccup doesn't hide the listeners for hours
+            self.monthly_listeners.set(
+                artist_id,
+                monthly_listeners,
+                ttl=60 if monthly_listeners == "N/A" else None,
+            )
+            if access_token:
+                self.__set_token(access_token, expires_at)
+
+        try:
+            bearer_token = await self.__get_token()
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError):
+            # without a token the track can't be looked up, the rest of the info is still useful
+            return (monthly_listeners, *self.parse_track_response({}))
+        found = await self.__scan(
+            self.api_partner_url.format(spotify_track=spotify_track),
+            self.track_patterns,
+            self.track_max_bytes,
+            headers={"authorization": f"Bearer {bearer_token}"},
         )
 
+        return (monthly_listeners, *self.parse_track_response(found))
+
 
 if __name__ == "__main__":
     import uvloop
@@ -0,0 +1,67 @@
+import re
+from typing import AsyncIterable, Iterable
+
+
+class StreamScanner:
+    """Looks for byte patterns in a response that arrives in chunks, so that we can stop reading it
+    as soon as everything we need was found.
+
+    Only the last `overlap` bytes of the previous chunk are kept around, so a value can't be longer than that.
+    For every pattern the first match is kept, its groups are joined and decoded.
+    """
+
+    __slots__ = ("remaining", "found", "bytes_read", "overlap", "_tail")
+
+    def __init__(
+        self, patterns: dict[str, re.Pattern[bytes]], overlap: int = 512
+    ) -> None:
+        self.remaining = dict(patterns)
+        self.found: dict[str, str] = {}
+        self.bytes_read = 0
+        self.overlap = overlap
+        self._tail = b""
+
+    @property
+    def done(self) -> bool:
+        return not self.remaining
+
+    def feed(self, chunk: bytes) -> bool:
+        """Scan the next chunk.
+
+        Args:
+            chunk (bytes): The next bytes of the stream.
+
+        Returns:
+            bool: True if every pattern was found.
+        """
+        self.bytes_read += len(chunk)
+        data = self._tail + chunk
+
+        for name, pattern in tuple(self.remaining.items()):
+            match = pattern.search(data)
+            if match:
+                self.found[name] = b"".join(
+                    group for group in match.groups() if group is not None
+                ).decode()
+                del self.remaining[name]
+
+        self._tail = data[-self.overlap :]
+        return not self.remaining
+
+    def feed_all(
+        self, chunks: Iterable[bytes], max_bytes: int | None = None
+    ) -> dict[str, str]:
+        """Feed chunks until everything was found, the chunks run out or `max_bytes` were read."""
+        for chunk in chunks:
+            if self.feed(chunk) or (max_bytes and self.bytes_read >= max_bytes):
+                break
+        return self.found
+
+    async def scan(
+        self, chunks: AsyncIterable[bytes], max_bytes: int | None = None
+    ) -> dict[str, str]:
+        """Same as `feed_all` but for async iterables, like `resp.content.iter_chunked(...)`."""
+        async for chunk in chunks:
+            if self.feed(chunk) or (max_bytes and self.bytes_read >= max_bytes):
+                break
+        return self.found
@@ -0,0 +1,95 @@
+import time
+from typing import Any, Hashable
+
+from lru import LRU
+
+
+class TTLCache:
+    """A size bounded LRU cache where every entry also expires after a given amount of seconds.
+
+    It keeps track of hits, misses, evictions (entries dropped because the cache was full)
+    and expirations (entries dropped because they were too old).
+    """
+
+    __slots__ = ("ttl", "hits", "misses", "evictions", "expirations", "_data")
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Args:
+            max_size (int): The maximum amount of entries the cache can hold.
+            ttl (float): The default time to live of an entry, in seconds.
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = LRU(max_size, callback=self.__on_evict)
+
+    def __on_evict(self, _key: Hashable, _value: tuple[float, Any]) -> None:
+        self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Whether there is a fresh entry for the key, without counting it as a hit or a miss."""
+        entry = self._data.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value from the cache, counting it as a hit or a miss.
+
+        Args:
+            key (Hashable): The key of the entry.
+            default (Any, optional): What to return if the entry is missing or expired. Defaults to None.
+
+        Returns:
+            Any: The cached value or the default.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Add or replace an entry in the cache.
+
+        Args:
+            key (Hashable): The key of the entry.
+            value (Any): The value to cache.
+            ttl (float | None, optional): Overrides the default time to live for this entry. Defaults to None.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """Returns the counters of the cache and its hit ratio."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self._data.get_size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
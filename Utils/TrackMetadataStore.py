@@ -0,0 +1,73 @@
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+if TYPE_CHECKING:
+    from bot import CritBot
+
+
+class TrackMetadataStore:
+    """Persists the track info (views, likes, subscribers, etc.) in the database so it survives restarts.
+
+    Entries older than `max_age` seconds are considered stale and are ignored.
+    """
+
+    __slots__ = ("bot", "max_age")
+
+    def __init__(self, bot: "CritBot", max_age: float) -> None:
+        self.bot = bot
+        self.max_age = max_age
+
+    async def get(
+        self, source: str, identifier: str
+    ) -> tuple[dict[str, Any], float] | None:
+        """Get the stored info of a track if it isn't stale.
+
+        Args:
+            source (str): The source of the track. E.g. youtube.
+            identifier (str): The identifier of the track in that source.
+
+        Returns:
+            tuple[dict[str, Any], float] | None: The info and its age in seconds or None if there is no fresh info.
+        """
+        async with self.bot.db_pool.acquire() as conn:
+            record = await conn.fetchrow(
+                """
+                SELECT info, EXTRACT(EPOCH FROM NOW() - fetched_at) AS age FROM track_metadata
+                WHERE source = $1 AND identifier = $2 AND fetched_at > NOW() - make_interval(secs => $3);
+                """,
+                source,
+                identifier,
+                self.max_age,
+            )
+
+        if record is None:
+            return None
+        return orjson.loads(record["info"]), float(record["age"])
+
+    async def set(self, source: str, identifier: str, info: dict[str, Any]) -> None:
+        """Insert or refresh the info of a track.
+
+        Args:
+            source (str): The source of the track. E.g. youtube.
+            identifier (str): The identifier of the track in that source.
+            info (dict[str, Any]): The info to store.
+        """
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(
+                """
+                INSERT INTO track_metadata (source, identifier, info) VALUES ($1, $2, $3)
+                ON CONFLICT (source, identifier) DO UPDATE SET info = excluded.info, fetched_at = NOW();
+                """,
+                source,
+                identifier,
+                orjson.dumps(info).decode(),
+            )
+
+    async def purge_stale(self) -> None:
+        """Delete the entries that are stale, they would be refetched anyway."""
+        async with self.bot.db_pool.acquire() as conn:
+            await conn.execute(
+                "DELETE FROM track_metadata WHERE fetched_at < NOW() - make_interval(secs => $1);",
+                self.max_age,
+            )
@@ -0,0 +1,237 @@
+import random
+from itertools import accumulate
+from typing import Any, Callable, Iterable, Iterator, SupportsIndex, TypeGuard
+
+import wavelink
+
+from .QueuedTrack import QueuedTrack
+
+
+class _TrackList(list):
+    """The list of tracks of a TrackQueue.
+
+    The tracks are stored as QueuedTracks and turned back into Playables when they are read,
+    wavelink's Queue methods don't need to know about it.
+
+    It also keeps the prefix sums of the lengths of the tracks, so the time until any position is a subtraction.
+
+    Adding to the end and taking from the start, which is what a queue does most, keep the sums up to date.
+    Anything else (put_at, remove, shuffle, etc.) marks them as stale and they are rebuilt in O(n) the next time they are needed.
+
+    `on_change` is called after every change, it must be cheap, it runs for every track that is played.
+    """
+
+    __slots__ = ("_sums", "_start", "_stale", "on_change")
+
+    def __init__(self, iterable: Iterable = ()) -> None:
+        super().__init__(map(self._compact, iterable))
+        # _sums[_start + i] is the length of every track before position i
+        self._sums = [0]
+        self._start = 0
+        self._stale = True
+        self.on_change: Callable[[], None] | None = None
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            self.on_change()
+
+    @staticmethod
+    def _compact(track: wavelink.Playable | QueuedTrack) -> QueuedTrack:
+        if isinstance(track, QueuedTrack):
+            return track
+        return QueuedTrack.from_playable(track)
+
+    @staticmethod
+    def _length(track: QueuedTrack) -> int:
+        return 0 if track.is_stream else track.length
+
+    def records(self) -> Iterator[QueuedTrack]:
+        """Iterate over the tracks without turning them into Playables."""
+        return super().__iter__()
+
+    def _rebuild(self) -> None:
+        self._sums = [0, *accumulate(map(self._length, self.records()))]
+        self._start = 0
+        self._stale = False
+
+    def time_until(self, index: int) -> int:
+        """How long until the track at `index` starts playing, in milliseconds, without counting the current track."""
+        if self._stale:
+            self._rebuild()
+        return self._sums[self._start + index] - self._sums[self._start]
+
+    def __getitem__(self, index: SupportsIndex | slice) -> Any:
+        if isinstance(index, slice):
+            return [track.to_playable() for track in super().__getitem__(index)]
+        return super().__getitem__(index).to_playable()
+
+    def __iter__(self) -> Iterator[wavelink.Playable]:
+        return (track.to_playable() for track in super().__iter__())
+
+    def __reversed__(self) -> Iterator[wavelink.Playable]:
+        return (track.to_playable() for track in super().__reversed__())
+
+    def append(self, track: wavelink.Playable | QueuedTrack) -> None:
+        track = self._compact(track)
+        super().append(track)
+        if not self._stale:
+            self._sums.append(self._sums[-1] + self._length(track))
+        self._changed()
+
+    def extend(self, tracks: Iterable[wavelink.Playable | QueuedTrack]) -> None:
+        tracks = list(map(self._compact, tracks))
+        super().extend(tracks)
+        if not self._stale:
+            running = self._sums[-1]
+            for track in tracks:
+                running += self._length(track)
+                self._sums.append(running)
+        self._changed()
+
+    def pop(self, index: SupportsIndex = -1) -> wavelink.Playable:
+        track = super().pop(index).to_playable()
+        self._changed()
+        if self._stale:
+            return track
+
+        if index == 0:
+            self._start += 1
+            # don't let the sums of the tracks that already left grow forever
+            if self._start > 1024 and self._start * 2 > len(self._sums):
+                del self._sums[: self._start]
+                self._start = 0
+        elif index == -1 or index == len(self):
+            self._sums.pop()
+        else:
+            self._stale = True
+        return track
+
+    def clear(self) -> None:
+        super().clear()
+        self._sums = [0]
+        self._start = 0
+        self._stale = False
+        self._changed()
+
+    def insert(
+        self, index: SupportsIndex, track: wavelink.Playable | QueuedTrack
+    ) -> None:
+        super().insert(index, self._compact(track))
+        self._stale = True
+        self._changed()
+
+    def remove(self, track: wavelink.Playable | QueuedTrack) -> None:
+        super().remove(track)
+        self._stale = True
+        self._changed()
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            value = list(map(self._compact, value))
+        else:
+            value = self._compact(value)
+        super().__setitem__(index, value)
+        self._stale = True
+        self._changed()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._stale = True
+        self._changed()
+
+    def __iadd__(self, tracks: Iterable[wavelink.Playable]) -> "_TrackList":
+        self.extend(tracks)
+        return self
+
+    def splice(
+        self, index: int, tracks: Iterable[wavelink.Playable | QueuedTrack]
+    ) -> None:
+        """Insert the tracks at `index` in one go, the tracks after it are only moved once."""
+        if index >= len(self):
+            self.extend(tracks)
+            return
+        super().__setitem__(slice(index, index), list(map(self._compact, tracks)))
+        self._stale = True
+        self._changed()
+
+    def copy(self) -> list[wavelink.Playable]:
+        return list(self)
+
+    def shuffle(self) -> None:
+        # random.shuffle would turn every track into a Playable and back
+        tracks = list(self.records())
+        random.shuffle(tracks)
+        super().__setitem__(slice(None), tracks)
+        self._stale = True
+        self._changed()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._stale = True
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._stale = True
+        self._changed()
+
+
+class TrackQueue(wavelink.Queue):
+    """A wavelink Queue that keeps its tracks as QueuedTracks and knows how long until each of them plays.
+
+    Listing the queue with the estimated time of every track is linear instead of quadratic.
+    QueuedTracks can be put directly, Playables are converted when they are put and the tracks that are read are always Playables.
+    """
+
+    def __init__(
+        self, *, history: bool = True, on_change: Callable[[], None] | None = None
+    ) -> None:
+        """
+        Args:
+            history (bool, optional): If the queue keeps a history of the played tracks. Defaults to True.
+            on_change (Callable[[], None] | None, optional): Called every time the tracks change. Defaults to None.
+        """
+        super().__init__(history=history)
+        self._items = _TrackList()
+        self._items.on_change = on_change
+
+    @staticmethod
+    def _check_compatibility(item: object) -> TypeGuard[wavelink.Playable]:
+        if not isinstance(item, (wavelink.Playable, QueuedTrack)):
+            raise TypeError("This queue is restricted to Playable objects.")
+        return True
+
+    def put_many_at(
+        self, index: int, tracks: Iterable[wavelink.Playable | QueuedTrack], /
+    ) -> int:
+        """Insert several tracks at `index`, keeping their order.
+
+        Calling put_at for each of them moves the whole queue once per track, this moves it once.
+
+        Returns:
+            int: The number of tracks added to the queue.
+        """
+        tracks = list(tracks)
+        self._check_atomic(tracks)
+        self._items.splice(index, tracks)
+        self._wakeup_next()
+        return len(tracks)
+
+    def shuffle(self) -> None:
+        self._items.shuffle()
+
+    def records(self) -> Iterator[QueuedTrack]:
+        """Iterate over the queued tracks without turning them into Playables."""
+        return self._items.records()
+
+    def time_until(self, index: int) -> int:
+        """How long until the track at `index` starts playing, in milliseconds, without counting the current track.
+
+        Streams count as 0, there is no way to know how long they will play.
+        """
+        return self._items.time_until(index)
+
+    @property
+    def duration(self) -> int:
+        """The length of every track in the queue, in milliseconds."""
+        return self._items.time_until(len(self._items))
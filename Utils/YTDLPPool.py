@@ -0,0 +1,213 @@
+import asyncio
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+import orjson
+from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadError, YoutubeDLError
+
+
+class YTDLPPoolFull(Exception):
+    pass
+
+
+# the idle YoutubeDL instances of the current worker process by their options, the least recently used first.
+# an instance is taken out while a job uses it, it keeps state of the run and can't be shared
+_instances: OrderedDict[bytes, list[YoutubeDL]] = OrderedDict()
+_instances_lock = threading.Lock()
+_max_instances = 8
+
+
+def _init_worker(max_instances: int) -> None:
+    global _max_instances
+    _max_instances = max_instances
+
+
+@contextmanager
+def _checkout(opts: dict[str, Any]) -> Iterator[YoutubeDL]:
+    """An instance built with the options, it is put back to be reused when the job ends."""
+    key = orjson.dumps(opts, option=orjson.OPT_SORT_KEYS)
+    with _instances_lock:
+        idle = _instances.get(key)
+        ytdlp = idle.pop() if idle else None
+    if ytdlp is None:
+        # YoutubeDL adds its defaults to the dict it gets
+        ytdlp = YoutubeDL(dict(opts))
+
+    try:
+        yield ytdlp
+    finally:
+        evicted = []
+        with _instances_lock:
+            _instances.setdefault(key, []).append(ytdlp)
+            _instances.move_to_end(key)
+            # the options of the downloads change with the format and bitrate, don't keep all of them
+            while sum(map(len, _instances.values())) > _max_instances:
+                oldest = next(iter(_instances))
+                evicted.append(_instances[oldest].pop(0))
+                if not _instances[oldest]:
+                    del _instances[oldest]
+        for old in evicted:
+            old.close()
+
+
+def _extract_info(
+    opts: dict[str, Any], url: str, download: bool, directory: str | None = None
+) -> dict | None:
+    """Runs inside of a worker process. The returned dict has to be picklable so it gets sanitized."""
+    with _checkout(opts) as ytdlp:
+        # the directory changes with every download, it isn't part of the options the instances are reused by
+        paths = ytdlp.params.get("paths") or {}
+        if directory is not None:
+            ytdlp.params["paths"] = {**paths, "home": directory}
+        try:
+            info = ytdlp.extract_info(url, download=download)
+        except YoutubeDLError as e:
+            # yt-dlp's errors keep the traceback around and can't be sent back to the bot process
+            raise DownloadError(str(e)) from None
+        finally:
+            ytdlp.params["paths"] = paths
+        if info is None:  # with ignoreerrors yt-dlp returns None instead of raising
+            return None
+        return ytdlp.sanitize_info(info)
+
+
+class YTDLPPool:
+    """A dedicated pool of processes for yt-dlp.
+
+    yt-dlp does a lot of pure Python parsing, running it in threads would hold the GIL and stall the event loop.
+    At most `workers` jobs run at the same time and at most `max_queue` jobs wait for a free worker,
+    past that new jobs are refused with `YTDLPPoolFull` instead of piling up.
+    Each worker reuses up to `max_instances` YoutubeDL instances, building one is slower than most extractions.
+    A job that times out is stopped by replacing the processes, a stuck extraction would hold its worker forever.
+    """
+
+    __slots__ = (
+        "workers",
+        "timeout",
+        "download_timeout",
+        "max_queue",
+        "pending",
+        "max_instances",
+        "_executor",
+        "_semaphore",
+    )
+
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 30,
+        download_timeout: float = 300,
+        max_queue: int = 16,
+        max_instances: int = 8,
+    ) -> None:
+        """
+        Args:
+            workers (int, optional): The number of worker processes. Defaults to 2.
+            timeout (float, optional): How long to wait for an extraction, in seconds. Defaults to 30.
+            download_timeout (float, optional): How long to wait for a download, in seconds. Defaults to 300.
+            max_queue (int, optional): How many jobs can wait for a free worker. Defaults to 16.
+            max_instances (int, optional): How many YoutubeDL instances each worker keeps. Defaults to 8.
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.download_timeout = download_timeout
+        self.max_queue = max_queue
+        self.pending = 0  # running + waiting jobs
+        self.max_instances = max_instances
+
+        self._executor = self._new_executor()
+        self._semaphore = asyncio.Semaphore(workers)
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawn instead of fork because the bot process has a running event loop and multiple threads
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.max_instances,),
+        )
+
+    def _recycle(self, executor: ProcessPoolExecutor) -> None:
+        """Replaces the processes of the executor, the only way to stop a job that is stuck in one of them."""
+        if executor is not self._executor:  # another timeout already did it
+            return
+        self._executor = self._new_executor()
+        # the jobs of the killed processes end with BrokenProcessPool, which frees their slots
+        for process in list(executor._processes.values()):
+            process.kill()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def __release(self, future: Future) -> None:
+        self.pending -= 1
+        self._semaphore.release()
+        # nobody waits for the jobs that timed out, their errors would be logged as never retrieved
+        if not future.cancelled():
+            future.exception()
+
+    async def _run(self, timeout: float, func: Callable, *args) -> Any:
+        if self.pending >= self.workers + self.max_queue:
+            raise YTDLPPoolFull(f"There are already {self.pending} yt-dlp jobs.")
+
+        self.pending += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.pending -= 1
+            raise
+
+        executor = self._executor
+        future = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        # the worker slot is only freed when the job really ends, not when the caller stops waiting for it
+        future.add_done_callback(self.__release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except TimeoutError:
+            self._recycle(executor)
+            raise
+        except BrokenProcessPool:
+            if executor is self._executor:
+                raise
+            # it was killed with a job that timed out, it gets another go in the new processes
+            return await self._run(timeout, func, *args)
+
+    async def extract_info(
+        self, opts: dict[str, Any], url: str, download: bool = False
+    ) -> dict | None:
+        """Equivalent to `YoutubeDL(opts).extract_info(url, download)` but inside of a worker process.
+
+        Raises:
+            YTDLPPoolFull: There are too many jobs waiting.
+            TimeoutError: The job took too long, it was stopped.
+        """
+        return await self._run(
+            self.download_timeout if download else self.timeout,
+            _extract_info,
+            opts,
+            url,
+            download,
+        )
+
+    async def download(
+        self, opts: dict[str, Any], url: str, directory: str | None = None
+    ) -> dict | None:
+        """Downloads the url and returns its info, the final file path is in `info["requested_downloads"][0]["filepath"]`.
+
+        Args:
+            opts (dict[str, Any]): The options, the same ones reuse the same YoutubeDL instance.
+            url (str): What to download.
+            directory (str | None, optional): Where to download to, the `outtmpl` of the options has to be relative.
+                Defaults to the `paths` of the options.
+        """
+        return await self._run(
+            self.download_timeout, _extract_info, opts, url, True, directory
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
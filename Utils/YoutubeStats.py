@@ -0,0 +1,114 @@
+import asyncio
+import datetime
+import re
+
+import aiohttp
+
+from .StreamScanner import StreamScanner
+
+
+class YoutubeStats:
+    """This class is used to get the views, likes, subscribers, upload date and uploader url of a YouTube video.
+
+    yt-dlp's extract_info also resolves the formats, the signatures and the player JS, which we don't need for the now playing embed.
+    Instead this reads the watch page and stops as soon as every field was found,
+    the video details are in ytInitialPlayerResponse and the likes and subscribers in ytInitialData, which comes right after it.
+    """
+
+    __slots__ = ("session", "watch_url")
+
+    patterns = {
+        "view_count": re.compile(rb'"viewCount":"(\d+)"'),
+        "channel_id": re.compile(rb'"(?:externalChannelId|channelId)":"(UC[\w-]{22})"'),
+        "uploader_url": re.compile(rb'"ownerProfileUrl":"([^"]+)"'),
+        "upload_date": re.compile(rb'"uploadDate":"(\d{4}-\d{2}-\d{2}[^"]*)"'),
+        "like_count": re.compile(rb"like this video along with ([\d,.]+) other"),
+        "subs": re.compile(
+            rb'"subscriberCountText":.{0,200}?"simpleText":"([^" ]+)', re.DOTALL
+        ),
+    }
+    # without these there is no point on showing the embed, the others might legitimately be missing (e.g. hidden likes)
+    required = ("view_count", "upload_date", "channel_id")
+    max_bytes = 4 * 1024 * 1024
+
+    def __init__(self, session: aiohttp.ClientSession) -> None:
+        self.session = session
+        self.watch_url = "https://www.youtube.com/watch?v={video_id}&hl=en&gl=US"
+
+    @staticmethod
+    def parse_count(text: str) -> int | None:
+        """Parses counts like `18,386,124` or `4.2M`."""
+        multipliers = {"K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+        text = text.replace(",", "")
+        multiplier = multipliers.get(text[-1:].upper(), 1)
+        if multiplier != 1:
+            text = text[:-1]
+        try:
+            return int(float(text) * multiplier)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def parse_date(text: str) -> str | None:
+        """Parses the upload date to YYYYMMDD. Like yt-dlp, a date with a time and a timezone is converted to UTC first,
+        `2009-10-24T23:57:33-07:00` is the 25th.
+        """
+        try:
+            date = datetime.datetime.fromisoformat(text)
+        except ValueError:
+            return None
+        if date.tzinfo is not None:
+            date = date.astimezone(datetime.timezone.utc)
+        return date.strftime("%Y%m%d")
+
+    @classmethod
+    def to_info(cls, found: dict[str, str]) -> dict[str, str | int] | None:
+        """Converts the scanned fields to the same keys yt-dlp uses in its info dict.
+
+        Returns:
+            dict[str, str | int] | None: The info or None if one of the required fields is missing.
+        """
+        if any(field not in found for field in cls.required):
+            return None
+        upload_date = cls.parse_date(found["upload_date"])
+        if upload_date is None:
+            return None
+
+        uploader_url = found.get("uploader_url")
+        if uploader_url:
+            uploader_url = uploader_url.replace("http://", "https://", 1)
+
+        info = {
+            "view_count": int(found["view_count"]),
+            "like_count": cls.parse_count(found.get("like_count", "")),
+            "channel_follower_count": cls.parse_count(found.get("subs", "")),
+            "upload_date": upload_date,  # YYYYMMDD
+            "uploader_url": uploader_url,
+            "channel_id": found["channel_id"],
+        }
+        # like yt-dlp, the missing fields are left out
+        return {key: value for key, value in info.items() if value is not None}
+
+    async def get_stats(self, video_id: str) -> dict[str, str | int] | None:
+        """Get the stats of a video from its watch page.
+
+        Args:
+            video_id (str): The YouTube video ID.
+
+        Returns:
+            dict[str, str | int] | None: A subset of yt-dlp's info dict or None if the page couldn't be parsed, in that case use yt-dlp.
+        """
+        scanner = StreamScanner(self.patterns)
+        try:
+            async with self.session.get(
+                self.watch_url.format(video_id=video_id),
+                headers={"Accept-Language": "en-US,en"},
+                cookies={"SOCS": "CAI"},  # skips the EU consent page
+            ) as resp:
+                if resp.status != 200:
+                    return None
+                await scanner.scan(resp.content.iter_chunked(16384), self.max_bytes)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+        return self.to_info(scanner.found)
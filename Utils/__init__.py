@@ -1,6 +1,21 @@
 from . import Paginator
 from .CritHelpCommand import CritHelpCommand
-from .GeniusLyrics import SongNotFound, GeniusLyrics
+from .GeniusLyrics import SongNotFound, GeniusLyrics, LyricsParser
 from .SponsorBlock import SponsorBlock, SponsorBlockCache, SponsorBlockCategories
 from .Converters import BoolConverter
 from .SpotifyTrackInfo import SpotifyTrackInfo
+from .TTLCache import TTLCache
+from .YTDLPPool import YTDLPPool, YTDLPPoolFull
+from .TrackMetadataStore import TrackMetadataStore
+from .SingleFlight import SingleFlight
+from .StreamScanner import StreamScanner
+from .YoutubeStats import YoutubeStats
+from .LyricsCache import LyricsCache
+from .TrackQueue import TrackQueue
+from .CritNode import CritNode
+from .CritPlayer import CritPlayer
+from .QueuedTrack import QueuedTrack
+from .QueueStore import QueueStore, RestoredContext
+from .SearchCache import SearchCache
+from .DownloadManager import DownloadManager, DownloadQueueFull, Reservation
+from .DownloadCache import DownloadCache
@@ -0,0 +1,112 @@
+"""Offline benchmarks of the scrapers and parsers in Utils, they run against the pages in ./fixtures.
+
+The checked in fixtures are synthetic: made here with the same structure, markers and size as the real pages
+but filled with made up text, and written to contain what the new parsers look for. So the numbers say how the parsers
+scale and not how they do on the real markup, and the parsers agreeing with yt-dlp/lxml on them proves nothing,
+those checks only run on captured pages (see `verified`).
+`python -m benchmarks.capture` records the real pages into ./fixtures/captured, when a page is there it is used instead
+and the results are named `(captured)` instead of `(synthetic)`.
+
+Run them from the root of the repository, all of them with `python -m benchmarks` or one with e.g. `python -m benchmarks.youtube_stats`.
+"""
+
+import gzip
+import os
+import time
+import tracemalloc
+from typing import Callable, Iterator
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures")
+CAPTURED_PATH = os.path.join(FIXTURES_PATH, "captured")
+
+# name: {"us_per_call": ..., "peak_kib": ..., "kept_kib": ..., "bytes_read": ...}, filled by `bench`
+results: dict[str, dict[str, float | int | None]] = {}
+
+
+def load_fixture(name: str) -> bytes:
+    """Loads a fixture, the .gz ones are decompressed."""
+    with open(os.path.join(FIXTURES_PATH, name), "rb") as f:
+        data = f.read()
+    return gzip.decompress(data) if name.endswith(".gz") else data
+
+
+def load_page(name: str) -> tuple[bytes, str]:
+    """Loads the captured page if there is one and the synthetic fixture otherwise.
+
+    Returns:
+        tuple[bytes, str]: The page and where it came from, "captured" or "synthetic".
+    """
+    if os.path.exists(os.path.join(CAPTURED_PATH, name)):
+        return load_fixture(os.path.join("captured", name)), "captured"
+    return load_fixture(name), "synthetic"
+
+
+def verified(name: str, source: str) -> bool:
+    """Whether to check a parser against the one it replaced, only on captured pages."""
+    if source != "captured":
+        print(f"{name}: not checked against the old parser, the page is synthetic")
+    return source == "captured"
+
+
+def chunked(data: bytes, size: int = 16384) -> Iterator[bytes]:
+    """Splits the data like aiohttp's `iter_chunked` would."""
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
+
+
+def measure(func: Callable[[], object], number: int = 100) -> float:
+    """Returns the average time of a call to func, in seconds."""
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number
+
+
+def memory_usage(func: Callable[[], object]) -> tuple[int, int]:
+    """Returns how many bytes were allocated at the worst point of a call to func and how many are still used by what it returned.
+
+    tracemalloc only sees the allocations made through Python, the ones lxml does in C aren't counted.
+    """
+    tracemalloc.start()
+    try:
+        # what func returns has to be alive while the memory is measured
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+        del result
+        return peak, current
+    finally:
+        tracemalloc.stop()
+
+
+def bench(
+    name: str,
+    func: Callable[[], object],
+    number: int = 100,
+    bytes_read: int | None = None,
+    total_bytes: int | None = None,
+) -> None:
+    """Measures func, prints a line with the results and keeps them in `results`.
+    The kept memory is what is still allocated after the call while the value it returned is alive.
+
+    Args:
+        name (str): The name of the benchmark, it should be unique.
+        func (Callable[[], object]): What to measure.
+        number (int, optional): How many times to call it. Defaults to 100.
+        bytes_read (int | None, optional): How much of the fixture func needs to read, if it reads one. Defaults to None.
+        total_bytes (int | None, optional): The size of that fixture. Defaults to None.
+    """
+    us_per_call = measure(func, number) * 1_000_000
+    peak, kept = memory_usage(func)
+    peak_kib, kept_kib = peak / 1024, kept / 1024
+    results[name] = {
+        "us_per_call": us_per_call,
+        "peak_kib": peak_kib,
+        "kept_kib": kept_kib,
+        "bytes_read": bytes_read,
+    }
+
+    line = f"{name:<32} {us_per_call:>12.2f} us/call {peak_kib:>10.1f} KiB peak {kept_kib:>10.1f} KiB kept"
+    if bytes_read is not None:
+        line += f" {bytes_read:>10} / {total_bytes} bytes read"
+    print(line)
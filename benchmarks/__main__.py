@@ -0,0 +1,71 @@
+"""Runs every benchmark, e.g. `python -m benchmarks --save before.json` and then `python -m benchmarks --compare before.json`.
+
+The comparison exits with 1 if a benchmark got slower (or allocates or reads more) than the tolerance allows,
+the numbers depend on the machine so only compare runs from the same one.
+"""
+
+import argparse
+import sys
+
+import orjson
+
+from benchmarks import genius, music, queue, results, spotify, youtube_stats
+
+MODULES = (music, queue, spotify, genius, youtube_stats)
+
+
+def compare(baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, before in baseline.items():
+        after = results.get(name)
+        if after is None:
+            continue
+        for metric, old in before.items():
+            new = after[metric]
+            if old is None or new is None:
+                continue
+            # bytes read are exact, the rest is noisy
+            limit = old if metric == "bytes_read" else old * (1 + tolerance)
+            if new > limit:
+                regressions.append(f"{name}: {metric} went from {old:.2f} to {new:.2f}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--save", help="write the results to this json file")
+    parser.add_argument("--compare", help="compare the results with this json file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="how much slower/bigger a result can be before it is a regression (default: 0.25)",
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "rb") as f:
+            baseline = orjson.loads(f.read())
+
+    for module in MODULES:
+        print(f"\n{module.__name__}")
+        module.main()
+
+    if args.save:
+        with open(args.save, "wb") as f:
+            f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+    if baseline is not None:
+        regressions = compare(baseline, args.tolerance)
+        print()
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
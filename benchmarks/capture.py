@@ -0,0 +1,115 @@
+"""Records the real pages the benchmarks parse into ./fixtures/captured, the benchmarks use them instead of the synthetic ones.
+
+It needs the internet, the pages are fetched the same way the bot fetches them, e.g.:
+
+    python -m benchmarks.capture
+    python -m benchmarks.capture --genius https://genius.com/Queen-bohemian-rhapsody-lyrics
+
+The pages have no personal data (nothing is logged in), check them before committing anyway.
+"""
+
+import argparse
+import asyncio
+import gzip
+import os
+
+import aiohttp
+
+from benchmarks import CAPTURED_PATH
+from Utils import SpotifyTrackInfo, YoutubeStats
+
+
+async def genius_song(
+    session: aiohttp.ClientSession, args: argparse.Namespace
+) -> bytes:
+    async with session.get(args.genius) as resp:
+        resp.raise_for_status()
+        return await resp.read()
+
+
+async def youtube_watch(
+    session: aiohttp.ClientSession, args: argparse.Namespace
+) -> bytes:
+    # the same request YoutubeStats makes, the whole page
+    async with session.get(
+        YoutubeStats(session).watch_url.format(video_id=args.youtube),
+        headers={"Accept-Language": "en-US,en"},
+        cookies={"SOCS": "CAI"},
+    ) as resp:
+        resp.raise_for_status()
+        return await resp.read()
+
+
+async def spotify_artist(
+    session: aiohttp.ClientSession, args: argparse.Namespace
+) -> bytes:
+    url = SpotifyTrackInfo(session).artist_url.format(artist_id=args.spotify_artist)
+    async with session.get(url) as resp:
+        resp.raise_for_status()
+        return await resp.read()
+
+
+async def spotify_track(
+    session: aiohttp.ClientSession, args: argparse.Namespace
+) -> bytes:
+    # the whole getTrack response of the partner API, with an anonymous token like SpotifyTrackInfo
+    spotify = SpotifyTrackInfo(session)
+    async with session.get(spotify.token_url) as resp:
+        resp.raise_for_status()
+        access_token = (await resp.json())["accessToken"]
+    async with session.get(
+        spotify.api_partner_url.format(spotify_track=args.spotify_track),
+        headers={"authorization": f"Bearer {access_token}"},
+    ) as resp:
+        resp.raise_for_status()
+        return await resp.read()
+
+
+# fixture name: how to get it
+PAGES = {
+    "genius_song.html.gz": genius_song,
+    "youtube_watch.html.gz": youtube_watch,
+    "spotify_artist.html.gz": spotify_artist,
+    "spotify_track.json.gz": spotify_track,
+}
+
+
+async def capture(args: argparse.Namespace) -> None:
+    os.makedirs(CAPTURED_PATH, exist_ok=True)
+    async with aiohttp.ClientSession() as session:
+        for name, fetch in PAGES.items():
+            try:
+                data = await fetch(session, args)
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+                print(f"{name}: failed, {e!r}")
+                continue
+            with open(os.path.join(CAPTURED_PATH, name), "wb") as f:
+                f.write(gzip.compress(data))
+            print(f"{name}: {len(data)} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Records the real pages.")
+    parser.add_argument(
+        "--genius",
+        default="https://genius.com/Rick-astley-never-gonna-give-you-up-lyrics",
+        help="The genius.com song page.",
+    )
+    parser.add_argument(
+        "--youtube", default="dQw4w9WgXcQ", help="The id of the YouTube video."
+    )
+    parser.add_argument(
+        "--spotify-artist",
+        default="3qiHUAX7zY4Qnjx8TNUzVx",
+        help="The id of the Spotify artist.",
+    )
+    parser.add_argument(
+        "--spotify-track",
+        default="2ph0vvxsYbMZXN5rjfRRWf",
+        help="The id of the Spotify track.",
+    )
+    asyncio.run(capture(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
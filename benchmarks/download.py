@@ -0,0 +1,80 @@
+"""What a download costs with and without transcoding, in cpu time and in size per minute of audio.
+
+It downloads for real (it needs ffmpeg and the internet, so it isn't part of `python -m benchmarks`), e.g.:
+
+    python -m benchmarks.download https://www.youtube.com/watch?v=dQw4w9WgXcQ
+
+Local files work too with file:// urls. The cpu time is the one of this process (yt-dlp) plus ffmpeg's.
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from yt_dlp import YoutubeDL
+
+from cogs.music import Music
+
+
+def cpu_time() -> float:
+    # ffmpeg runs in a child process
+    usage = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        rusage = resource.getrusage(who)
+        usage += rusage.ru_utime + rusage.ru_stime
+    return usage
+
+
+def download(url: str, transcode: bool) -> tuple[dict, float, float, int]:
+    """Downloads the url like the download command would.
+
+    Returns:
+        tuple[dict, float, float, int]: The info, the cpu seconds, the wall seconds and the size of the file in bytes.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        opts = Music.get_download_opts(transcode)
+        opts["outtmpl"] = os.path.join(directory, "%(id)s.%(ext)s")
+        opts["ignoreerrors"] = False
+        opts["enable_file_urls"] = True
+
+        cpu, wall = cpu_time(), time.perf_counter()
+        with YoutubeDL(opts) as ytdlp:
+            info = ytdlp.extract_info(url, download=True)
+        cpu, wall = cpu_time() - cpu, time.perf_counter() - wall
+
+        if "entries" in info:
+            info = info["entries"][0]
+        path = info["requested_downloads"][0]["filepath"]
+        info["ext"] = os.path.splitext(path)[1].lstrip(".")
+        size = os.path.getsize(path)
+    return info, cpu, wall, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Compares the downloads with and without transcoding."
+    )
+    parser.add_argument("urls", nargs="+")
+    args = parser.parse_args()
+
+    print(
+        f"{'':<40} {'mode':<10} {'ext':<6} {'cpu s/min':>10} {'wall s/min':>11} {'MiB/min':>8} {'kbps':>6}"
+    )
+    for url in args.urls:
+        for transcode in (False, True):
+            info, cpu, wall, size = download(url, transcode)
+            minutes = (info.get("duration") or 0) / 60
+            if not minutes:
+                print(f"{url[:40]:<40} has no duration, skipped")
+                break
+            kbps = size * 8 / 1000 / (minutes * 60)
+            print(
+                f"{url[:40]:<40} {'transcode' if transcode else 'as is':<10} {info['ext']:<6} "
+                f"{cpu / minutes:>10.2f} {wall / minutes:>11.2f} {size / 1024 / 1024 / minutes:>8.2f} {kbps:>6.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compares Utils.LyricsParser (incremental, stops after the lyrics) with parsing the whole genius.com page with lxml.
+
+The lyrics are only checked against lxml's on a captured page.
+"""
+
+import lxml.html
+
+from benchmarks import bench, chunked, load_page, verified
+from Utils import LyricsParser
+
+
+def incremental(page: bytes) -> tuple[str | None, int]:
+    parser = LyricsParser()
+    bytes_read = 0
+    # the same chunk size GeniusLyrics reads with
+    for chunk in chunked(page, 65536):
+        bytes_read += len(chunk)
+        if parser.feed(chunk):
+            return parser.lyrics, bytes_read
+    return parser.close(), bytes_read
+
+
+def whole_page(page: bytes) -> str | None:
+    tree = lxml.html.fromstring(page)
+    div = tree.xpath(
+        '//div[contains(@class, "lyrics") or contains(@class, "Lyrics__Root")]'
+    )
+    if not div:
+        return None
+    return LyricsParser.extract(div[0])
+
+
+def main() -> None:
+    page, source = load_page("genius_song.html.gz")
+
+    lyrics, bytes_read = incremental(page)
+    assert lyrics
+    if verified("genius", source):
+        assert lyrics == whole_page(page)
+
+    bench(
+        f"genius: incremental ({source})",
+        lambda: incremental(page),
+        bytes_read=bytes_read,
+        total_bytes=len(page),
+    )
+    bench(
+        f"genius: whole page ({source})",
+        lambda: whole_page(page),
+        bytes_read=len(page),
+        total_bytes=len(page),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""The small helpers of the music cog that run for every track and every queue page."""
+
+from benchmarks import bench
+from cogs.music import Music
+
+DURATIONS = (0, 59_000, 213_000, 3_599_000, 36_000_000)
+COUNTS = (7, 999, 1_000, 1_234_567, 5_400_000_000, "N/A")
+
+
+def main() -> None:
+    bench(
+        "music: parse_duration",
+        lambda: [Music.parse_duration(duration) for duration in DURATIONS],
+        number=10000,
+    )
+    bench(
+        "music: human_format",
+        lambda: [Music.human_format(count) for count in COUNTS],
+        number=10000,
+    )
+
+
+if __name__ == "__main__":
+    main()
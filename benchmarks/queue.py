@@ -0,0 +1,122 @@
+"""Compares the memory of a playlist queued as Playables (how wavelink keeps them) with the same playlist in a TrackQueue.
+
+The playlist is made here instead of being a fixture, the encoded tracks have to be real
+for the QueuedTracks to be turned back into Playables.
+"""
+
+import base64
+
+import orjson
+import wavelink
+
+from benchmarks import bench
+from Utils import QueuedTrack, TrackQueue
+
+PLAYLIST_LENGTH = 5000
+
+
+def write_utf(value: str) -> bytes:
+    # the titles here don't have characters outside of the BMP, so this is the same as java's modified UTF-8
+    data = value.encode()
+    return len(data).to_bytes(2) + data
+
+
+def encode_track(info: dict, source_data: bytes = b"") -> str:
+    """The opposite of `QueuedTrack.decode_info`, version 3 of Lavalink's track encoding."""
+    message = (
+        bytes([3])
+        + write_utf(info["title"])
+        + write_utf(info["author"])
+        + info["length"].to_bytes(8, signed=True)
+        + write_utf(info["identifier"])
+        + bytes([info["isStream"]])
+        + b"".join(
+            b"\x00" if info[key] is None else b"\x01" + write_utf(info[key])
+            for key in ("uri", "artworkUrl", "isrc")
+        )
+        + write_utf(info["sourceName"])
+        + source_data
+        + info["position"].to_bytes(8, signed=True)
+    )
+    # the flag says there is a version, the rest is the size of the message
+    header = (1 << 30 | len(message)).to_bytes(4)
+    return base64.b64encode(header + message).decode()
+
+
+def spotify_playlist() -> bytes:
+    """What Lavalink (with LavaSrc) sends for a big Spotify playlist."""
+    tracks = []
+    for i in range(PLAYLIST_LENGTH):
+        identifier = f"{i:0>22}"
+        info = {
+            "identifier": identifier,
+            "isSeekable": True,
+            "author": f"Artist {i % 300}",
+            "length": 120_000 + i * 37 % 180_000,
+            "isStream": False,
+            "position": 0,
+            "title": f"Song number {i} (feat. Someone Else) - Remastered 2011",
+            "uri": f"https://open.spotify.com/track/{identifier}",
+            "artworkUrl": f"https://i.scdn.co/image/ab67616d0000b273{i:0>24}",
+            "isrc": f"USUM7{i:0>7}",
+            "sourceName": "spotify",
+        }
+        plugin_info = {
+            "albumName": f"Album {i % 500}",
+            "albumUrl": f"https://open.spotify.com/album/{i % 500:0>22}",
+            "artistUrl": f"https://open.spotify.com/artist/{i % 300:0>22}",
+            "artistArtworkUrl": f"https://i.scdn.co/image/ab6761610000e5eb{i % 300:0>24}",
+            "previewUrl": f"https://p.scdn.co/mp3-preview/{i:0>40}",
+            "isPreview": False,
+        }
+        source_data = b"".join(
+            b"\x01" + write_utf(str(value))
+            for value in plugin_info.values()
+            if isinstance(value, str)
+        )
+        tracks.append(
+            {
+                "encoded": encode_track(info, source_data),
+                "info": info,
+                "pluginInfo": plugin_info,
+                "userData": {},
+            }
+        )
+    return orjson.dumps(tracks)
+
+
+def as_playables(response: bytes) -> list[wavelink.Playable]:
+    return [wavelink.Playable(data) for data in orjson.loads(response)]
+
+
+def as_track_queue(response: bytes) -> TrackQueue:
+    queue = TrackQueue()
+    queue.put(
+        [
+            QueuedTrack.from_playable(wavelink.Playable(data), 1234567890)
+            for data in orjson.loads(response)
+        ]
+    )
+    return queue
+
+
+def main() -> None:
+    response = spotify_playlist()
+
+    queue = as_track_queue(response)
+    assert queue[0] == as_playables(response)[0]
+    assert queue[0].raw_data["info"] == orjson.loads(response)[0]["info"]
+
+    bench(
+        f"queue: {PLAYLIST_LENGTH} Playables", lambda: as_playables(response), number=3
+    )
+    bench(
+        f"queue: {PLAYLIST_LENGTH} QueuedTracks",
+        lambda: as_track_queue(response),
+        number=3,
+    )
+    bench("queue: get the next track", lambda: queue[0], number=10000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compares Utils.SpotifyTrackInfo's streaming scan with parsing the whole responses with lxml/orjson.
+
+Before the scan, fixed amounts of bytes were read and the fields were looked up at fixed offsets, that only worked as long as Spotify didn't move them.
+The results are only checked against lxml/orjson on captured responses.
+"""
+
+import lxml.html
+import orjson
+
+from benchmarks import bench, chunked, load_page, verified
+from Utils import SpotifyTrackInfo, StreamScanner
+
+
+def scan(data: bytes, patterns: dict, max_bytes: int) -> tuple[dict, int]:
+    scanner = StreamScanner(patterns)
+    # the same chunk size SpotifyTrackInfo reads with
+    scanner.feed_all(chunked(data, 4096), max_bytes)
+    return scanner.found, scanner.bytes_read
+
+
+def lxml_artist_page(data: bytes) -> tuple[str, float, str]:
+    html = lxml.html.fromstring(data)
+    description = html.xpath('//meta[@property="og:description"]/@content')[0]
+    session = orjson.loads(html.xpath('//script[@id="session"]')[0].text_content())
+    return (
+        session["accessToken"],
+        session["accessTokenExpirationTimestampMs"] / 1000,
+        description.split("· ")[1].split(" ")[0],
+    )
+
+
+def orjson_track(data: bytes) -> tuple[str, str, bool]:
+    track = orjson.loads(data)["data"]["trackUnion"]
+    return (
+        track["playcount"],
+        track["albumOfTrack"]["date"]["isoString"][:10],
+        track["contentRating"]["label"] == "EXPLICIT",
+    )
+
+
+def main() -> None:
+    artist_page, artist_source = load_page("spotify_artist.html.gz")
+    track, track_source = load_page("spotify_track.json.gz")
+    artist_patterns = SpotifyTrackInfo.artist_page_patterns
+    artist_max_bytes = SpotifyTrackInfo.artist_page_max_bytes
+    track_patterns = SpotifyTrackInfo.track_patterns
+    track_max_bytes = SpotifyTrackInfo.track_max_bytes
+
+    found, bytes_read = scan(artist_page, artist_patterns, artist_max_bytes)
+    if verified("spotify: artist page", artist_source):
+        assert SpotifyTrackInfo.parse_artist_page(found) == lxml_artist_page(
+            artist_page
+        )
+    bench(
+        f"spotify: artist page scan ({artist_source})",
+        lambda: scan(artist_page, artist_patterns, artist_max_bytes),
+        bytes_read=bytes_read,
+        total_bytes=len(artist_page),
+    )
+    bench(
+        f"spotify: artist page lxml ({artist_source})",
+        lambda: lxml_artist_page(artist_page),
+        bytes_read=len(artist_page),
+        total_bytes=len(artist_page),
+    )
+
+    found, bytes_read = scan(track, track_patterns, track_max_bytes)
+    if verified("spotify: track", track_source):
+        playcount, release_date, explicit = orjson_track(track)
+        year, month, day = release_date.split("-")
+        assert SpotifyTrackInfo.parse_track_response(found) == (
+            playcount,
+            f"{day}-{month}-{year}",
+            explicit,
+        )
+    bench(
+        f"spotify: track scan ({track_source})",
+        lambda: scan(track, track_patterns, track_max_bytes),
+        number=1000,
+        bytes_read=bytes_read,
+        total_bytes=len(track),
+    )
+    bench(
+        f"spotify: track orjson ({track_source})",
+        lambda: orjson_track(track),
+        number=1000,
+        bytes_read=len(track),
+        total_bytes=len(track),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Compares Utils.YoutubeStats (stats only, early terminating read) with yt-dlp parsing the same watch page.
+
+yt-dlp's extract_info also downloads the player JS and resolves the formats and signatures,
+none of that can be measured offline, so its numbers here are a lower bound.
+On a captured page every field YoutubeStats finds is checked against what yt-dlp (the fallback) gets from it,
+with the same lookups yt-dlp's YoutubeIE._real_extract does.
+"""
+
+import datetime
+
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor.youtube import YoutubeIE
+from yt_dlp.utils import (
+    NO_DEFAULT,
+    get_first,
+    parse_count,
+    parse_iso8601,
+    traverse_obj,
+    unified_strdate,
+)
+
+from benchmarks import bench, chunked, load_page, verified
+from Utils import StreamScanner, YoutubeStats
+
+
+def stats_only(page: bytes) -> tuple[dict, int]:
+    scanner = StreamScanner(YoutubeStats.patterns)
+    scanner.feed_all(chunked(page), YoutubeStats.max_bytes)
+    return YoutubeStats.to_info(scanner.found), scanner.bytes_read
+
+
+def ytdlp(ie: YoutubeIE, page: str) -> tuple[dict, dict]:
+    player_response = ie._search_json(
+        ie._YT_INITIAL_PLAYER_RESPONSE_RE, page, "initial player response", "bench"
+    )
+    initial_data = ie.extract_yt_initial_data("bench", page)
+    return player_response, initial_data
+
+
+def ytdlp_info(ie: YoutubeIE, player_response: dict, initial_data: dict) -> dict:
+    """The fields YoutubeStats gets, found like yt-dlp finds them."""
+    video_details = player_response.get("videoDetails") or {}
+    microformats = traverse_obj(
+        player_response, ("microformat", "playerMicroformatRenderer"), default={}
+    )
+    contents = traverse_obj(
+        initial_data,
+        ("contents", "twoColumnWatchNextResults", "results", "results", "contents"),
+        expected_type=list,
+        default=[],
+    )
+    vpir = get_first(contents, "videoPrimaryInfoRenderer")
+    vor = traverse_obj(
+        get_first(contents, "videoSecondaryInfoRenderer"),
+        ("owner", "videoOwnerRenderer"),
+    )
+
+    timestamp = parse_iso8601(microformats.get("uploadDate"), timezone=NO_DEFAULT)
+    channel_handle = ie.handle_from_url(microformats.get("ownerProfileUrl"))
+    info = {
+        "view_count": int(video_details["viewCount"]),
+        "like_count": traverse_obj(
+            vpir,
+            (
+                "videoActions",
+                "menuRenderer",
+                "topLevelButtons",
+                ...,
+                "segmentedLikeDislikeButtonViewModel",
+                "likeButtonViewModel",
+                "likeButtonViewModel",
+                "toggleButtonViewModel",
+                "toggleButtonViewModel",
+                "defaultButtonViewModel",
+                "buttonViewModel",
+                "accessibilityText",
+                {parse_count},
+            ),
+            get_all=False,
+        ),  # fmt: skip
+        "channel_follower_count": ie._get_count(vor, "subscriberCountText"),
+        "upload_date": datetime.datetime.fromtimestamp(
+            timestamp, datetime.timezone.utc
+        ).strftime("%Y%m%d")
+        if timestamp
+        else unified_strdate(microformats.get("uploadDate")),
+        "uploader_url": f"https://www.youtube.com/{channel_handle}"
+        if channel_handle
+        else None,
+        "channel_id": video_details.get("channelId"),
+    }
+    return {key: value for key, value in info.items() if value is not None}
+
+
+def main() -> None:
+    page, source = load_page("youtube_watch.html.gz")
+    text = page.decode()
+    ie = YoutubeIE(YoutubeDL({"quiet": True}))
+
+    info, bytes_read = stats_only(page)
+    assert info is not None
+    if verified("youtube", source):
+        expected = ytdlp_info(ie, *ytdlp(ie, text))
+        # the counts of the page are rounded (e.g. 4.2M subscribers), yt-dlp rounds them the same way
+        mismatches = {
+            field: (info.get(field), expected.get(field))
+            for field in expected.keys() | info.keys()
+            if info.get(field) != expected.get(field)
+        }
+        for field, (ours, theirs) in mismatches.items():
+            print(f"youtube: {field} is {ours!r} but yt-dlp found {theirs!r}")
+        assert not mismatches
+
+    bench(
+        f"youtube: stats only ({source})",
+        lambda: stats_only(page),
+        bytes_read=bytes_read,
+        total_bytes=len(page),
+    )
+    # + the player JS and the formats, which can't be measured offline
+    bench(
+        f"youtube: yt-dlp ({source})",
+        lambda: ytdlp(ie, text),
+        bytes_read=len(page),
+        total_bytes=len(page),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,9 +17,11 @@ from discord.ext import commands, tasks
 from i18n import I18n, Translator
 from Utils import (
     CritHelpCommand,
+    CritNode,
     SponsorBlock,
     SponsorBlockCache,
     SponsorBlockCategories,
+    YTDLPPool,
 )
 
 
@@ -43,6 +45,9 @@ class CritBot(commands.Bot):
         genius_token: str,
         spotify_cred: dict[str, str],
         reddit_cred: dict[str, str],
+        ytdlp_pool: Optional[dict[str, int]] = None,
+        lavalink_nodes: Optional[list[dict[str, str]]] = None,
+        downloads: Optional[dict[str, int]] = None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -56,12 +61,16 @@ class CritBot(commands.Bot):
         self.invite_link = invite_link
         self.source_link = source_link
         self.lavalink = lavalink
+        self.lavalink_nodes = lavalink_nodes or []
         self.owner_id = owner_id
         self.__start_time = time.time()
         self.dev = dev
         self.genius_token = genius_token
         self.spotify_cred = spotify_cred
         self.reddit_cred = reddit_cred
+        # the configs from before the pool don't have it, YTDLPPool has defaults for everything
+        self.ytdlp_pool_config = ytdlp_pool or {}
+        self.downloads_config = downloads or {}
 
         self.submissions = []
         self.reddit: asyncpraw.Reddit = None
@@ -74,7 +83,9 @@ class CritBot(commands.Bot):
         self.default_language = default_language
         self.i18n = i18n
 
-        self.wavelink_node: wavelink.Node = None
+        self.wavelink_nodes: list[CritNode] = []
+
+        self.ytdlp_pool: YTDLPPool = None
 
         self.sponsorblock: SponsorBlock
         self.sponsorblock_cache: dict[int, SponsorBlockCache]
@@ -121,16 +132,25 @@ class CritBot(commands.Bot):
 
         self.help_command = CritHelpCommand(i18n=self.i18n, slash=False)
 
-        # Initiate the lavalink client
-        self.wavelink_node = wavelink.Node(
-            uri=self.lavalink["ip"] + ":" + self.lavalink["port"],
-            password=self.lavalink["password"],
-            inactive_channel_tokens=3,
-            inactive_player_timeout=None,
-        )
-        nodes = [self.wavelink_node]
+        self.ytdlp_pool = YTDLPPool(**self.ytdlp_pool_config)
+
+        # Initiate the lavalink client, the players are spread between all the nodes by their load
+        for node in (self.lavalink, *self.lavalink_nodes):
+            uri = node["ip"] + ":" + node["port"]
+            self.wavelink_nodes.append(
+                CritNode(
+                    identifier=node.get("identifier", uri),
+                    uri=uri,
+                    password=node["password"],
+                    inactive_channel_tokens=3,
+                    inactive_player_timeout=None,
+                )
+            )
 
-        await wavelink.Pool.connect(nodes=nodes, client=self, cache_capacity=100)
+        # the searches are cached by the Music cog, with the queries normalized
+        await wavelink.Pool.connect(
+            nodes=self.wavelink_nodes, client=self, cache_capacity=None
+        )
 
         self.sponsorblock = SponsorBlock(self)
         self.sponsorblock_cache = await self.sponsorblock.get_cache()
@@ -159,6 +179,21 @@ class CritBot(commands.Bot):
 
         self.batch_update_commands.start()
 
+    def get_wavelink_node(self, guild_id: int) -> wavelink.Node:
+        """Returns the node of the guild's player, or the least loaded one if there is no player.
+        The requests about a player (sponsorblock categories, etc.) have to go to its node.
+        """
+        guild = self.get_guild(guild_id)
+        player = guild.voice_client if guild else None
+        if isinstance(player, wavelink.Player):
+            return player.node
+        return CritNode.best()
+
+    async def close(self) -> None:
+        if self.ytdlp_pool:
+            self.ytdlp_pool.shutdown()
+        await super().close()
+
     async def on_ready(self) -> None:
         await self.change_presence(
             activity=discord.Activity(
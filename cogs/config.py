@@ -133,7 +133,7 @@ class Config(commands.Cog):
             self.bot.sponsorblock.update_categories(
                 ctx.guild.id,
                 self.bot.sponsorblock_cache[ctx.guild.id].active_categories,
-                self.bot.wavelink_node,
+                self.bot.get_wavelink_node(ctx.guild.id),
             ),
         )
 
@@ -167,7 +167,7 @@ class Config(commands.Cog):
             self.bot.sponsorblock.update_categories(
                 ctx.guild.id,
                 self.bot.sponsorblock_cache[ctx.guild.id].active_categories,
-                self.bot.wavelink_node,
+                self.bot.get_wavelink_node(ctx.guild.id),
             ),
         )
 
@@ -202,7 +202,7 @@ class Config(commands.Cog):
                 self.bot.sponsorblock.update_categories(
                     ctx.guild.id,
                     self.bot.sponsorblock_cache[ctx.guild.id].active_categories,
-                    self.bot.wavelink_node,
+                    self.bot.get_wavelink_node(ctx.guild.id),
                 ),
             )
         else:
@@ -219,7 +219,7 @@ class Config(commands.Cog):
                 self.bot.sponsorblock.update_categories(
                     ctx.guild.id,
                     self.bot.sponsorblock_cache[ctx.guild.id].active_categories,
-                    self.bot.wavelink_node,
+                    self.bot.get_wavelink_node(ctx.guild.id),
                 ),
             )
 
@@ -1,12 +1,16 @@
+import datetime
 import os
 import sys
 from typing import Optional
 
 import discord
+import wavelink
 from discord import app_commands
 from discord.app_commands import locale_str as _T
 from discord.ext import commands
 
+from Utils import CritNode
+
 
 #command_attres=dict(hidden=True)
 class Dev(commands.Cog):
@@ -220,6 +224,46 @@ class Dev(commands.Cog):
         await ctx.send(embed=embed)
 
 
+    @commands.is_owner()
+    @commands.hybrid_command()
+    async def nodes(self, ctx) -> None:
+        """Shows the load of every Lavalink node."""
+        embed = discord.Embed(title=self.t("embed_fields", "title"))
+        best = CritNode.best() if any(node.status is wavelink.NodeStatus.CONNECTED for node in self.bot.wavelink_nodes) else None
+        for node in self.bot.wavelink_nodes:
+            value = self.t("embed_fields", "status", status=node.status.name, players=len(node.players), penalty=f"{node.penalty:.1f}")
+            if node.stats is not None:
+                value += self.t("embed_fields", "stats",
+                                players=node.stats.players,
+                                playing=node.stats.playing,
+                                system_load=f"{node.stats.cpu.system_load:.0%}",
+                                lavalink_load=f"{node.stats.cpu.lavalink_load:.0%}",
+                                memory=node.stats.memory.used // (1024 * 1024),
+                                uptime=datetime.timedelta(milliseconds=node.stats.uptime))
+            if node.stats is not None and node.stats.frames is not None:
+                value += self.t("embed_fields", "frames", deficit=node.stats.frames.deficit, nulled=node.stats.frames.nulled)
+            embed.add_field(name=f"{node.identifier} \u2b50" if node is best else node.identifier, value=value, inline=False)
+
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.hybrid_command()
+    async def caches(self, ctx) -> None:
+        """Shows the hit ratio and size of the caches."""
+        music = self.bot.get_cog("Music")
+        if music is None:
+            await ctx.send(self.t("err", "music_not_loaded"))
+            return
+
+        embed = discord.Embed(title=self.t("embed_fields", "title"))
+        for name, stats in music.cache_stats().items():
+            value = self.t("embed_fields", "stats", **stats | {"hit_ratio": f"{stats['hit_ratio']:.1%}"})
+            if "coalesced" in stats:
+                value += self.t("embed_fields", "coalesced", coalesced=stats["coalesced"])
+            embed.add_field(name=name.title(), value=value, inline=False)
+
+        await ctx.send(embed=embed)
+
     #DANGEROUS
     @commands.is_owner()
     @commands.hybrid_command(name=_T("print"))
@@ -1,7 +1,10 @@
 import asyncio
 import datetime
 import os
+import re
+import shutil
 import urllib.parse
+import uuid
 from typing import Optional, cast
 
 import aiofiles.os
@@ -9,13 +12,35 @@ import discord
 import orjson
 import wavelink
 from discord import app_commands
-from discord.ext import commands
-from yt_dlp import YoutubeDL
-from yt_dlp.utils import ExtractorError
+from discord.ext import commands, tasks
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.utils import DownloadError, ExtractorError, sanitize_filename
 
 # import the bot class from bot.py
 from bot import CritBot
-from Utils import BoolConverter, GeniusLyrics, Paginator, SongNotFound, SpotifyTrackInfo
+from Utils import (
+    BoolConverter,
+    CritNode,
+    CritPlayer,
+    DownloadCache,
+    DownloadManager,
+    DownloadQueueFull,
+    GeniusLyrics,
+    LyricsCache,
+    Paginator,
+    QueuedTrack,
+    QueueStore,
+    Reservation,
+    RestoredContext,
+    SearchCache,
+    SingleFlight,
+    SongNotFound,
+    SpotifyTrackInfo,
+    TrackMetadataStore,
+    TTLCache,
+    YoutubeStats,
+    YTDLPPoolFull,
+)
 
 
 class Music(commands.Cog):
@@ -23,32 +48,63 @@ class Music(commands.Cog):
         self.bot = bot
         self.t = self.bot.i18n.t
         self.log = self.bot.logger.log
-        self.ytdlp_download_opts = {
-            "format": "bestaudio/best",
-            "outtmpl": "/tmp/%(title)s.%(ext)s",
-            "noplaylist": True,
-            "nocheckcertificate": True,
-            "ignoreerrors": True,
-            "logtostderr": False,
-            "quiet": True,
-            "no_warnings": True,
-            "default_search": "auto",
-            "postprocessors": [
-                {
-                    "key": "FFmpegExtractAudio",
-                    "preferredcodec": "mp3",
-                    "preferredquality": "320",
-                }
-            ],
-        }
+        self.download_transcode = self.bot.downloads_config.get("transcode", False)
+        # the files of the download command are kept, the same tracks are downloaded again and again
+        self.download_cache = DownloadCache(
+            self.bot.downloads_config.get("cache_dir", "/tmp/critbot/downloads"),
+            budget=self.bot.downloads_config.get("cache_budget_mb", 2048) * 1024 * 1024,
+        )
+        # only used to extract the info, the format of each download is picked from it
+        self.ytdlp_download_opts = self.get_download_opts(self.download_transcode)
+        # (extractor, id, upload limit): (cache key, title, uploader) of the last download of the track,
+        # to send it again from the cache without extracting its info first
+        self.download_picks = TTLCache(max_size=1024, ttl=24 * 60 * 60)
         self.ytdlp_extract_info_opts = {
             "quiet": True,
             "skip_download": True,
         }
 
-        self.ytdlp_extract = YoutubeDL(self.ytdlp_extract_info_opts)
-        self.ytdlp_download = YoutubeDL(self.ytdlp_download_opts)
         self.SpotifyTrackInfo = SpotifyTrackInfo(self.bot.web_client)
+        self.YoutubeStats = YoutubeStats(self.bot.web_client)
+        self.genius_lyrics = GeniusLyrics(self.bot.genius_token, self.bot.web_client)
+        self.lyrics_cache = LyricsCache(self.bot, max_size=256)
+
+        # (source, identifier): track info, the stats don't change much in an hour
+        self.track_info_cache = TTLCache(max_size=1024, ttl=60 * 60)
+        # the same info but in the database, so it isn't lost when the bot restarts
+        self.track_metadata = TrackMetadataStore(self.bot, max_age=6 * 60 * 60)
+        self.info_sources = ("youtube", "spotify", "soundcloud")
+        # the same songs are searched again and again, in every guild
+        self.search_cache = SearchCache(max_size=512, ttl=30 * 60)
+
+        # the /play autocomplete waits for the user to stop typing before searching, only searches once per user at a time
+        # and never takes more than the 3 seconds discord gives it
+        self.autocomplete_debounce = 0.35
+        self.autocomplete_deadline = 2.5
+        self.autocomplete_min_length = 3
+        # user id: the last thing they typed
+        self.autocomplete_latest: dict[int, str] = {}
+        # user id: their search that is running
+        self.autocomplete_searching: dict[int, asyncio.Task] = {}
+        self.autocomplete_semaphore = asyncio.Semaphore(4)
+        # the same track is often started in multiple guilds at once or prefetched while it starts
+        self.inflight = SingleFlight()
+
+        # how many of the upcoming tracks get their info fetched in advance and how many at once
+        self.prefetch_depth = 3
+        self.prefetch_semaphore = asyncio.Semaphore(4)
+
+        # the players are saved so they can continue after a restart
+        self.queue_store = QueueStore(self.bot)
+        self.queues_restored = False
+        self.queues_restoring = False
+
+        # the disk used by the downloads is counted by the manager, the ones that don't fit wait (for up to a minute)
+        self.downloads = DownloadManager(
+            budget=self.bot.downloads_config.get("budget_mb", 1024) * 1024 * 1024,
+            max_waiting=self.bot.downloads_config.get("max_waiting", 32),
+        )
+        self.download_max_wait = 60.0
 
     @commands.Cog.listener()
     async def on_wavelink_node_ready(
@@ -60,8 +116,68 @@ class Music(commands.Cog):
             f"({payload.node.players} players)",
         )
 
+        # the players that had nowhere to go when their node was lost, and the ones of this node if it came back
+        # without its session (Lavalink restarted), Lavalink doesn't have them anymore
+        orphans = [
+            player
+            for player in self.players()
+            if player.node.status is not wavelink.NodeStatus.CONNECTED
+            or (player.node is payload.node and not payload.resumed)
+        ]
+        if orphans:
+            self.bot.create_task(self.migrate_players(orphans))
+        if payload.resumed:
+            self.bot.create_task(self.destroy_moved_players(payload.node))
+        self.bot.create_task(self.maybe_restore_queues())
+
+    @commands.Cog.listener()
+    async def on_wavelink_node_disconnected(self, node: wavelink.Node) -> None:
+        self.log(
+            30,
+            f"Lost the connection to wavelink node <{node.identifier}>, moving its {len(node.players)} players.",
+        )
+        await self.migrate_players(list(node.players.values()))
+
+    async def migrate_players(self, players: list[CritPlayer]) -> None:
+        """Move the players to the healthy nodes, they continue where they were."""
+        for player in players:
+            try:
+                # one at a time so the next one sees the load of the ones before it
+                node = CritNode.best()
+            except wavelink.InvalidNodeException:
+                self.log(
+                    30,
+                    "There is no wavelink node to move the players to, they will be moved when one is ready.",
+                )
+                return
+
+            try:
+                await player.switch_node(node)
+                await self.send_sponsorblock_categories(player)
+            except Exception as e:
+                self.log(
+                    40,
+                    f"Failed to move the player of {player.guild} to wavelink node <{node.identifier}>: {e}",
+                )
+            else:
+                self.log(
+                    20,
+                    f"Moved the player of {player.guild} to wavelink node <{node.identifier}>.",
+                )
+
+    async def destroy_moved_players(self, node: wavelink.Node) -> None:
+        """A node that resumed its session still has the players that were moved away while it was gone, they would play twice."""
+        for info in await node.fetch_players():
+            if info.guild_id not in node.players:
+                await node.send(
+                    "DELETE",
+                    path=f"v4/sessions/{node.session_id}/players/{info.guild_id}",
+                )
+
     @commands.Cog.listener()
     async def on_wavelink_inactive_player(self, player: wavelink.Player) -> None:
+        # nobody was listening, it isn't continued after a restart
+        self.bot.create_task(self.queue_store.delete(player.guild.id))
         self.bot.create_task(player.disconnect())
 
     @commands.Cog.listener()
@@ -82,9 +198,8 @@ class Music(commands.Cog):
                     0
                 ]  # get the next track without removing it from the queue because the autoplay will already remove it
 
-            if (
-                track.source != "flowery-tts" and not track.first_playing
-            ):  # the info message is already sent if the track is the first one and it's not a tts track
+            # the tts tracks don't have an info message
+            if track.source != "flowery-tts":
                 self.bot.create_task(self.send_info_message(player.ctx, track))
 
     @commands.Cog.listener()
@@ -95,11 +210,12 @@ class Music(commands.Cog):
         if not player:
             return
 
+        self.prefetch_upcoming(player)
+        self.queue_store.mark(player)
+
         is_recommended = payload.original and payload.original.recommended
 
         if player.autoplay == wavelink.AutoPlayMode.enabled and is_recommended:
-            payload.track.ctx = player.ctx
-            player.current.ctx = player.ctx
             self.bot.create_task(
                 self.send_info_message(player.ctx, payload.track, is_recommended)
             )
@@ -108,22 +224,41 @@ class Music(commands.Cog):
     async def on_voice_state_update(
         self,
         member: discord.Member,
-        _before: discord.VoiceState,
+        before: discord.VoiceState,
         after: discord.VoiceState,
     ) -> None:
-        player = cast(wavelink.Player, member.guild.voice_client)
+        if (
+            member.id == self.bot.user.id
+            and after.channel is None
+            and not self.bot.is_closed()
+        ):
+            # kicked from the channel, the player is already gone by now so this can't wait for it.
+            # when the bot is closing it leaves every channel too, those players are the ones to restore
+            self.bot.create_task(self.queue_store.delete(member.guild.id))
+            return
+
+        player = cast(CritPlayer, member.guild.voice_client)
         if player is None:
             return
 
-        if after.channel != player.channel and member.id != self.bot.user.id:
-            real_members = 0
-            for m in player.channel.members:
-                if not m.bot:
-                    real_members += 1
-            if real_members == 0:
-                player.inactive_timeout = 300
+        if member.id == self.bot.user.id:
+            # joined or was moved to another channel, the only time the members are counted
+            if after.channel is not None:
+                player.listeners = sum(not m.bot for m in after.channel.members)
+                player.inactive_timeout = 0
+                self.queue_store.mark(player)
+            return
 
-        elif after.channel == player.channel:
+        # mute, deafen, etc. don't change who is listening
+        if member.bot or before.channel == after.channel:
+            return
+
+        if before.channel is not None and before.channel == player.channel:
+            player.listeners -= 1
+            if player.listeners <= 0:
+                player.inactive_timeout = 300
+        if after.channel is not None and after.channel == player.channel:
+            player.listeners += 1
             player.inactive_timeout = 0  # disable the inactive timeout so that while there is someone in the voice channel the bot won't disconnect
 
     @commands.Cog.listener()
@@ -196,8 +331,8 @@ class Music(commands.Cog):
                 await ctx.send(self.t("not_in_same_voice"))
                 return False
         else:
-            await asyncio.gather(
-                ctx.author.voice.channel.connect(self_deaf=True, cls=wavelink.Player),  # type: ignore
+            player, _ = await asyncio.gather(
+                ctx.author.voice.channel.connect(self_deaf=True, cls=CritPlayer),  # type: ignore
                 ctx.send(
                     self.t(
                         "cmd",
@@ -207,27 +342,48 @@ class Music(commands.Cog):
                     )
                 ),  # type: ignore
             )
+            player.on_change = self.queue_store.mark
 
-            await self.bot.wavelink_node.send(
-                "PUT",
-                path=f"v4/sessions/{self.bot.wavelink_node.session_id}/players/{ctx.guild.id}/sponsorblock/categories",
-                data=self.bot.sponsorblock_cache[ctx.guild.id].active_categories,
-            )
+            await self.send_sponsorblock_categories(player)
         return True
 
+    async def send_sponsorblock_categories(self, player: wavelink.Player) -> None:
+        await player.node.send(
+            "PUT",
+            path=f"v4/sessions/{player.node.session_id}/players/{player.guild.id}/sponsorblock/categories",
+            data=self.bot.sponsorblock_cache[player.guild.id].active_categories,
+        )
+
     @staticmethod
     def make_progress_bar(progress: int, total: int, length: int = 10) -> str:
         num_hash = int((progress / total) * length)
         return "⎯" * num_hash + ":radio_button:" + "⎯" * (length - num_hash - 1)
 
     @staticmethod
-    def put_playlist_at_beginning(
-        player: wavelink.Player, playlist: wavelink.Playlist
-    ) -> None:
-        length = len(playlist)
+    def with_requester(
+        track: wavelink.Playable, requester_id: int
+    ) -> wavelink.Playable:
+        """Returns a copy of the track with the requester in its extras.
+        The search results are cached and shared between guilds, so they can't be changed.
+        """
+        return wavelink.Playable(
+            {**track.raw_data, "userData": {"requester_id": requester_id}},
+            playlist=track.playlist,
+        )
 
-        for i in range(length - 1, -1, -1):
-            player.queue.put_at(0, playlist[i])
+    @staticmethod
+    def get_requester(
+        ctx: commands.Context, track: wavelink.Playable
+    ) -> discord.abc.User:
+        """Who requested the track, the recommended tracks are attributed to whoever used the last command."""
+        requester_id = getattr(track.extras, "requester_id", None)
+        if requester_id is None or requester_id == ctx.author.id:
+            return ctx.author
+        return (
+            ctx.guild.get_member(requester_id)
+            or ctx.bot.get_user(requester_id)
+            or ctx.author
+        )
 
     @staticmethod
     def human_format(num: int) -> str:
@@ -250,6 +406,11 @@ class Music(commands.Cog):
         Returns:
             str: The number of dislikes
         """
+        return await self.inflight.do(
+            ("dislikes", identifier), self._fetch_dislikes, identifier
+        )
+
+    async def _fetch_dislikes(self, identifier: str) -> int:
         async with self.bot.web_client.get(
             f"https://returnyoutubedislikeapi.com/votes?videoId={identifier}"
         ) as resp:
@@ -257,14 +418,63 @@ class Music(commands.Cog):
             return dislikes["dislikes"]
 
     async def get_track_info(self, track: wavelink.Playable) -> dict[str, str] | None:
+        """Get the info shown in the now playing embed, served from the cache when possible.
+
+        Args:
+            track (wavelink.Playable): The track to get the info from.
+
+        Returns:
+            dict[str, str] | None: The track info or None if the source is not supported.
+        """
+        if track.source not in self.info_sources:
+            return None
+
+        key = (track.source, track.identifier)
+        info = self.track_info_cache.get(key)
+        if info is not None:
+            return info
+
+        return await self.inflight.do(key, self._load_track_info, key, track)
+
+    async def _load_track_info(
+        self, key: tuple[str, str], track: wavelink.Playable
+    ) -> dict[str, str] | None:
+        stored = await self.track_metadata.get(*key)
+        if stored is not None:
+            info, age = stored
+            # don't keep it in memory for longer than it is fresh
+            self.track_info_cache.set(
+                key,
+                info,
+                ttl=min(self.track_info_cache.ttl, self.track_metadata.max_age - age),
+            )
+            return info
+
+        try:
+            info = await self._fetch_track_info(track)
+        except (YTDLPPoolFull, TimeoutError) as e:
+            self.log(30, f"Couldn't get the info of {track.uri}: {e!r}")
+            return None
+
+        if info is not None:
+            self.track_info_cache.set(key, info)
+            self.bot.create_task(self.track_metadata.set(*key, info))
+        return info
+
+    async def _fetch_track_info(
+        self, track: wavelink.Playable
+    ) -> dict[str, str] | None:
         match track.source:
             case "youtube":
                 dislikes_task = self.bot.loop.create_task(
                     self.get_dislikes(track.identifier)
                 )
-                info = await self.bot.loop.run_in_executor(
-                    None, self.ytdlp_extract.extract_info, track.identifier, False
-                )
+                info = await self.YoutubeStats.get_stats(track.identifier)
+                # the watch page couldn't be parsed, let yt-dlp do the work
+                if info is None:
+                    info = await self.bot.ytdlp_pool.extract_info(
+                        self.ytdlp_extract_info_opts, track.identifier
+                    )
 
                 view_count = self.human_format(info.get("view_count", "N/A"))
                 like_count = self.human_format(info.get("like_count", "N/A"))
@@ -301,13 +511,15 @@ class Music(commands.Cog):
 
                 return {
                     "monthly_listeners": monthly_listeners,
-                    "playcount": self.human_format(int(playcount)),
+                    "playcount": self.human_format(
+                        int(playcount) if playcount.isdigit() else playcount
+                    ),
                     "release_date": release_date,
                     "explicit": explicit,
                 }
             case "soundcloud":
-                info = await self.bot.loop.run_in_executor(
-                    None, self.ytdlp_extract.extract_info, track.uri, False
+                info = await self.bot.ytdlp_pool.extract_info(
+                    self.ytdlp_extract_info_opts, track.uri
                 )
 
                 playcount = self.human_format(info.get("view_count", "N/A"))
@@ -330,6 +542,31 @@ class Music(commands.Cog):
             case _:
                 return None
 
+    async def prefetch_track_info(self, track: wavelink.Playable) -> None:
+        async with self.prefetch_semaphore:
+            try:
+                await self.get_track_info(track)
+            except Exception as e:
+                self.log(10, f"Failed to prefetch the info of {track.uri}: {e!r}")
+
+    def prefetch_upcoming(self, player: wavelink.Player) -> None:
+        """Warms the track info cache with the next tracks of the queue (and of the autoplay queue)
+        so that their now playing embed doesn't have to wait for yt-dlp or the network.
+
+        Args:
+            player (wavelink.Player): The player that started a track.
+        """
+        upcoming = player.queue[: self.prefetch_depth]
+        if player.autoplay == wavelink.AutoPlayMode.enabled:
+            upcoming += player.auto_queue[: self.prefetch_depth]
+
+        for track in upcoming:
+            if (
+                track.source in self.info_sources
+                and (track.source, track.identifier) not in self.track_info_cache
+            ):
+                self.bot.create_task(self.prefetch_track_info(track))
+
     async def send_info_message(
         self,
         ctx: commands.Context,
@@ -365,15 +602,16 @@ class Music(commands.Cog):
             description=f"```{track.title}```",
         )
         embed.set_thumbnail(url=track.artwork)
+        requester = self.get_requester(ctx, track)
         embed.set_author(
             name=self.t(
                 "embed",
                 "author",
-                user=track.ctx.author.name,
+                user=requester.name,
                 mcog_name="music",
                 mcommand_name="play",
             ),
-            icon_url=track.ctx.author.avatar.url,
+            icon_url=requester.display_avatar.url,
         )
 
         info = await info
@@ -413,7 +651,7 @@ class Music(commands.Cog):
             value=track_length,
         )
 
-        if track.source == "youtube" or track.source == "soundcloud":
+        if info and (track.source == "youtube" or track.source == "soundcloud"):
             track.artist.url = info[
                 "uploader_url"
             ]  # for some reason lavalink doesn't set the artist url
@@ -430,7 +668,7 @@ class Music(commands.Cog):
                 "embed", "click", url=track.uri, mcog_name="music", mcommand_name="play"
             ),
         )
-        match track.source:
+        match track.source if info else None:
             case "youtube":
                 embed.add_field(
                     name=self.t(
@@ -502,9 +740,9 @@ class Music(commands.Cog):
 
         query = query.strip("<>")
 
-        tracks: wavelink.Search = await wavelink.Playable.search(query)
+        tracks: wavelink.Search = await self.search_cache.search(query)
 
-        player = cast(wavelink.Player, ctx.voice_client)
+        player = cast(CritPlayer, ctx.voice_client)
         player.ctx = ctx
 
         if not tracks:
@@ -524,44 +762,44 @@ class Music(commands.Cog):
                     )
                 )
             )
-            for track in tracks:
-                track.ctx = ctx
-                track.first_playing = False
+            # the queue keeps slim records of the tracks, they become Playables again when they are played
+            queued = [
+                QueuedTrack.from_playable(track, ctx.author.id) for track in tracks
+            ]
 
             if not player.playing:
-                tracks[0].first_playing = True
-                self.bot.create_task(player.play(tracks[0], volume=30))
-                self.bot.create_task(player.queue.put_wait(tracks[1:]))
-                self.bot.create_task(self.send_info_message(ctx, tracks[0]))
+                track = self.with_requester(tracks[0], ctx.author.id)
+                self.bot.create_task(player.play(track, volume=30))
+                self.bot.create_task(player.queue.put_wait(queued[1:]))
+                self.bot.create_task(self.send_info_message(ctx, track))
 
             else:
                 if play_next:
-                    self.put_playlist_at_beginning(player, tracks)
+                    player.queue.put_many_at(0, queued)
                 else:
-                    self.bot.create_task(player.queue.put_wait(tracks))
+                    self.bot.create_task(player.queue.put_wait(queued))
 
         else:
-            tracks[0].ctx = ctx
-            tracks[0].first_playing = not player.playing
+            track = self.with_requester(tracks[0], ctx.author.id)
             if not player.playing:
-                self.bot.create_task(player.play(tracks[0], volume=30))
-                self.bot.create_task(self.send_info_message(ctx, tracks[0]))
+                self.bot.create_task(player.play(track, volume=30))
+                self.bot.create_task(self.send_info_message(ctx, track))
             else:
                 self.bot.create_task(
                     ctx.send(
                         self.t(
                             "cmd",
                             "queued",
-                            track=tracks[0].title,
-                            author=tracks[0].author,
+                            track=track.title,
+                            author=track.author,
                         )
                     )
                 )
                 if play_next:
-                    player.queue.put_at(0, tracks[0])
+                    player.queue.put_at(0, track)
                 else:
                     self.bot.create_task(
-                        player.queue.put_wait(tracks[0]),
+                        player.queue.put_wait(track),
                     )
 
     @commands.hybrid_command(aliases=["p"])
@@ -573,6 +811,81 @@ class Music(commands.Cog):
         self.bot.i18n.command_name = "play"  # use the play command translations
         await self.play_logic(ctx, query, True)
 
+    @play.autocomplete("query")
+    @play_next.autocomplete("query")
+    async def query_autocomplete(
+        self, interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        query = current.strip()
+        # urls are already what they want to play
+        if len(query) < self.autocomplete_min_length or "://" in query:
+            return []
+
+        user_id = interaction.user.id
+        self.autocomplete_latest[user_id] = query
+        try:
+            # their previous search is still running, it is cached for the next keystroke when it finishes
+            if user_id in self.autocomplete_searching:
+                return []
+            if query not in self.search_cache:
+                await asyncio.sleep(self.autocomplete_debounce)
+                # they kept typing, the newer request answers instead
+                if self.autocomplete_latest.get(user_id) != query:
+                    return []
+                if user_id in self.autocomplete_searching:
+                    return []
+
+            # taken by this request until the search starts and then by the search itself
+            self.autocomplete_searching[user_id] = cast(
+                asyncio.Task, asyncio.current_task()
+            )
+            search = None
+            try:
+                async with asyncio.timeout(
+                    self.autocomplete_deadline - self.autocomplete_debounce
+                ):
+                    await self.autocomplete_semaphore.acquire()
+                    # the user and the semaphore are freed when the search ends, not when the autocomplete gives up on it,
+                    # otherwise a slow Lavalink would get a new search for every keystroke
+                    search = self.bot.loop.create_task(self.search_cache.search(query))
+                    self.autocomplete_searching[user_id] = search
+                    search.add_done_callback(
+                        lambda task: self.autocomplete_search_done(user_id, task)
+                    )
+                    tracks = await asyncio.shield(search)
+            except TimeoutError:
+                # the search keeps running and ends up in the cache
+                return []
+            finally:
+                if search is None:
+                    del self.autocomplete_searching[user_id]
+        finally:
+            if self.autocomplete_latest.get(user_id) == query:
+                del self.autocomplete_latest[user_id]
+
+        if not tracks or isinstance(tracks, wavelink.Playlist):
+            return []
+
+        # the value is the url, it is what gets searched when they pick the track
+        tracks = [track for track in tracks[:10] if track.uri and len(track.uri) <= 100]
+        self.search_cache.prime(tracks)
+        choices = []
+        for track in tracks:
+            name = (
+                f"{track.title} - {track.author} ({self.parse_duration(track.length)})"
+            )
+            choices.append(app_commands.Choice(name=name[:100], value=track.uri))
+        return choices
+
+    def autocomplete_search_done(self, user_id: int, task: asyncio.Task) -> None:
+        # only if it is still theirs
+        if self.autocomplete_searching.get(user_id) is task:
+            del self.autocomplete_searching[user_id]
+        self.autocomplete_semaphore.release()
+        # nobody waits for the searches that took too long
+        if not task.cancelled():
+            task.exception()
+
     @commands.hybrid_command(aliases=["autoplay", "ap"])
     async def auto_play(
         self, ctx: commands.Context, value: Optional[BoolConverter] = None
@@ -600,26 +913,17 @@ class Music(commands.Cog):
             player.autoplay = wavelink.AutoPlayMode.disabled
             await ctx.send(self.t("cmd", "disabled"))
 
-    def _estimate_time_until(
-        self, track: wavelink.Playable, player: wavelink.Player
-    ) -> str:
-        """Get the estimated until the given track is played.
+    def _estimate_time_until(self, index: int, player: CritPlayer) -> str:
+        """Get the estimated time until the track at the given position of the queue is played.
 
         Args:
-            track (wavelink.Playable): The track to estimate the time until.
-            player (wavelink.Player): The player to get the current position.
+            index (int): The position of the track in the queue.
+            player (CritPlayer): The player to get the current position.
 
         Returns:
             str: The estimated time until the track is played.
         """
-
-        track_index = player.queue.index(track)
-        total_time = 0
-        for i in range(track_index):
-            if player.queue[i].is_stream:
-                total_time += 0
-            else:
-                total_time += player.queue[i].length
+        total_time = player.queue.time_until(index)
 
         if player.playing:
             total_time += player.current.length - player.position
@@ -628,7 +932,7 @@ class Music(commands.Cog):
 
     @commands.hybrid_command(aliases=["q", "fila"])
     async def queue(self, ctx: commands.Context) -> None:
-        player = cast(wavelink.Player, ctx.voice_client)
+        player = cast(CritPlayer, ctx.voice_client)
         if not player:
             self.bot.create_task(ctx.reply(self.t("not_in_voice")))
             return
@@ -642,7 +946,7 @@ class Music(commands.Cog):
                     "embed",
                     "description",
                     track=player.current.title,
-                    user=player.current.ctx.author,
+                    user=self.get_requester(ctx, player.current),
                     current_time=self.parse_duration(player.position),
                     total_time=self.parse_duration(player.current.length)
                     if not player.current.is_stream
@@ -655,46 +959,52 @@ class Music(commands.Cog):
             self.bot.create_task(ctx.send(embed=embed))
             return
 
-        embeds = []
-        j = 0
-        embed = None
-        for i, track in enumerate(player.queue):
-            if j == 0:  # reset embed
-                embed = discord.Embed(
-                    description=self.t(
-                        "embed",
-                        "description",
-                        track=player.current.title,
-                        user=player.ctx.author,
-                        current_time=self.parse_duration(player.position),
-                        total_time=self.parse_duration(player.current.length)
-                        if not player.current.is_stream
-                        else "N/A",
-                    )
-                )
-                embed.set_author(
-                    icon_url=ctx.author.avatar.url, name=self.t("embed", "title")
-                )
+        per_page = 9
+        current = player.current
 
-            if track.is_stream:
-                length_and_estimated = (
-                    f"N/A / Est. {self._estimate_time_until(track, player)}"
+        # only the pages that are viewed are made, the queue can have thousands of tracks.
+        # they are made when a button is pressed, so the translations need the ctx to know the guild and the command
+        def make_page(page: int) -> discord.Embed:
+            embed = discord.Embed(
+                description=self.t(
+                    "embed",
+                    "description",
+                    track=current.title,
+                    user=self.get_requester(ctx, current),
+                    current_time=self.parse_duration(player.position),
+                    total_time=self.parse_duration(current.length)
+                    if not current.is_stream
+                    else "N/A",
+                    ctx=ctx,
                 )
-            else:
-                length_and_estimated = f"{self.parse_duration(track.length)} / Est. {self._estimate_time_until(track, player)}"
-
-            embed.add_field(name=f"{i+1}. {track.title}", value=length_and_estimated)
+            )
+            embed.set_author(
+                icon_url=ctx.author.avatar.url,
+                name=self.t("embed", "title", ctx=ctx),
+            )
 
-            if j >= 8:
-                embeds.append(embed)
-                j = 0
-                continue
+            start = page * per_page
+            for i, track in enumerate(
+                player.queue[start : start + per_page], start=start
+            ):
+                if track.is_stream:
+                    length_and_estimated = (
+                        f"N/A / Est. {self._estimate_time_until(i, player)}"
+                    )
+                else:
+                    length_and_estimated = f"{self.parse_duration(track.length)} / Est. {self._estimate_time_until(i, player)}"
 
-            if i == len(player.queue) - 1:
-                embeds.append(embed)
-            j += 1
+                embed.add_field(
+                    name=f"{i+1}. {track.title}", value=length_and_estimated
+                )
+            return embed
 
-        await Paginator.Simple(ephemeral=True).start(ctx, pages=embeds)
+        await Paginator.Simple(ephemeral=True).start(
+            ctx,
+            # the queue can change while they look at it
+            page_count=lambda: (len(player.queue) + per_page - 1) // per_page,
+            page_factory=make_page,
+        )
 
     @commands.hybrid_command(aliases=["s"])
     async def skip(self, ctx: commands.Context) -> None:
@@ -762,7 +1072,9 @@ class Music(commands.Cog):
             return
 
         await asyncio.gather(
-            self.send_reaction(ctx, "\u23f9\ufe0f"), ctx.voice_client.disconnect()
+            self.send_reaction(ctx, "\u23f9\ufe0f"),
+            self.queue_store.delete(ctx.guild.id),
+            ctx.voice_client.disconnect(),
         )
 
     @commands.hybrid_command(aliases=["entra"])
@@ -972,7 +1284,7 @@ class Music(commands.Cog):
             return
 
         player = cast(wavelink.Player, ctx.voice_client)
-        tracks: wavelink.Search = await wavelink.Playable.search(
+        tracks: wavelink.Search = await self.search_cache.search(
             "ftts://" + text + "?voice=" + voice
         )  # flower tts
         track = tracks[0]
@@ -1044,92 +1356,461 @@ class Music(commands.Cog):
             await ctx.send(self.t("cmd", "volume", volume=player.volume))
 
     @staticmethod
-    def get_expected_file_size(duration: int) -> int:
-        return duration * ((320 * 1000) // 8)
+    def get_download_opts(
+        transcode: bool = False,
+        format: str | None = None,
+        kbps: int | None = None,
+    ) -> dict:
+        """The yt-dlp options of the download command.
+
+        Without `transcode` an audio only format that Discord can play (Opus or M4A) is picked and sent as it is,
+        ffmpeg only copies the audio out of its container. It is only encoded (to mp3) when the codec isn't a common one.
+        With it everything is encoded to mp3, which takes a cpu core for a while and makes bigger files.
+        The `outtmpl` is relative, the directory of each download is given to `YTDLPPool.download`.
+
+        Args:
+            transcode (bool, optional): Always encode to mp3. Defaults to False.
+            format (str | None, optional): The id of the format to download, see `pick_download_format`. Defaults to the best audio.
+            kbps (int | None, optional): Encode to this bitrate, to mp3 with `transcode` and to opus without it,
+                even when the source already is in that codec. Defaults to None (320 for mp3).
+        """
+        if format is None:
+            format = (
+                "bestaudio/best"
+                if transcode
+                else "bestaudio[acodec=opus]/bestaudio[ext=m4a]/bestaudio/best"
+            )
+        if transcode:
+            codec = "mp3"
+        else:
+            codec = "best" if kbps is None else "opus"
+        outtmpl = "%(extractor_key)s-%(id)s-%(format_id)s.%(ext)s"
+
+        opts = {
+            "format": format,
+            "outtmpl": outtmpl,
+            "noplaylist": True,
+            "nocheckcertificate": True,
+            "ignoreerrors": True,
+            "logtostderr": False,
+            "quiet": True,
+            "no_warnings": True,
+            "default_search": "auto",
+            "postprocessors": [
+                {
+                    "key": "FFmpegExtractAudio",
+                    "preferredcodec": codec,
+                    "preferredquality": str(kbps or 320),
+                }
+            ],
+        }
+        if kbps is not None:
+            # yt-dlp only copies the audio when it already is in the codec (e.g. opus from YouTube, mp3 from SoundCloud)
+            # and ignores the bitrate, so the encoder is forced. The source gets an extension that is never the one
+            # of the result, otherwise yt-dlp doesn't even run ffmpeg
+            opts["outtmpl"] = outtmpl + ".source"
+            opts["postprocessor_args"] = {
+                "extractaudio+ffmpeg_o": [
+                    "-c:a",
+                    "libmp3lame" if transcode else "libopus",
+                    "-b:a",
+                    f"{kbps}k",
+                ]
+            }
+        return opts
 
     @staticmethod
-    def get_tmp_size() -> int:
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk("/tmp"):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                # skip if it is symbolic link
-                if not os.path.islink(fp):
-                    total_size += os.path.getsize(fp)
+    def pick_download_format(
+        info: dict, limit: int, transcode: bool = False
+    ) -> tuple[str, int | None, int] | None:
+        """Picks what to download so the file fits in Discord's upload limit, in one pass.
+
+        Without `transcode` it is the best audio only format (Opus first, then M4A) whose size fits,
+        sent as it is. When none of them fit it is encoded to opus with the highest bitrate that fits.
+        With `transcode` it is encoded to mp3, with the highest bitrate that fits up to 320kbps.
+        The sizes are the `filesize` (or `filesize_approx`) of the formats, or their bitrate times the duration.
+
+        Args:
+            info (dict): The info yt-dlp extracted, with its formats.
+            limit (int): The upload limit of the guild, in bytes.
+            transcode (bool, optional): Always encode to mp3. Defaults to False.
 
-        return total_size
+        Returns:
+            tuple[str, int | None, int] | None: The id of the format, the bitrate to encode to (None to send it as it is)
+            and how many bytes of disk the download needs, the source and the encoded file when it is encoded.
+            None if not even the lowest bitrate fits.
+        """
+        duration = info.get("duration")
+        # the containers and the bitrate estimates aren't exact
+        limit = int(limit * 0.95)
+
+        def size(format: dict) -> int | None:
+            filesize = format.get("filesize") or format.get("filesize_approx")
+            if filesize:
+                return filesize
+            bitrate = format.get("abr") or format.get("tbr")
+            if bitrate and duration:
+                return int(bitrate * 1000 / 8 * duration)
+            return None
+
+        formats = [
+            format
+            for format in info.get("formats") or [info]
+            if format.get("vcodec") == "none"
+            and format.get("acodec") not in (None, "none")
+        ]
+        if not transcode:
+            # opus, then m4a, then the rest, the best quality first
+            formats.sort(
+                key=lambda format: (
+                    format["acodec"].startswith("opus"),
+                    format.get("ext") == "m4a",
+                    format.get("abr") or format.get("tbr") or 0,
+                ),
+                reverse=True,
+            )
+            for format in formats:
+                expected = size(format)
+                if expected is not None and expected <= limit:
+                    return format["format_id"], None, expected
+
+        if not duration:
+            return None
+        # rounded down to a multiple of 8, so there are only a few different sets of options,
+        # the duration can be a float and the bitrate ends up in the options and in the cache key
+        kbps = min(320 if transcode else 160, int(limit * 8 / 1000 / duration) // 8 * 8)
+        if kbps < 32:
+            return None
+        # the source is on disk until ffmpeg is done with it, when its size is unknown it is at least bigger than the limit
+        source = size(info) or limit
+        return info["format_id"], kbps, source + int(kbps * 1000 / 8 * duration)
 
     @commands.hybrid_command(aliases=["transferir", "dl"])
     async def download(self, ctx: commands.Context, *, query: str) -> None:
         query = query.strip("<>")
+        limit = ctx.guild.filesize_limit
 
-        # download with info
         msg: discord.Message
         async with ctx.typing():
-            info, msg = await asyncio.gather(
-                self.bot.loop.run_in_executor(
-                    None, self.ytdlp_download.extract_info, query, False
-                ),
-                ctx.send(self.t("cmd", "checking")),
+            track_task = self.bot.loop.create_task(
+                asyncio.to_thread(self.get_url_track, query)
             )
+            msg = await ctx.send(self.t("cmd", "checking"))
+            track = await track_task
+
+            # a track that was already downloaded is sent from the cache without extracting its info again
+            last = self.download_picks.get((*track, limit)) if track else None
+            if last is not None and last[0] in self.download_cache:
+                info = picked = None
+                key, title, uploader = last
+            else:
+                extracted = await self.extract_download_info(ctx, msg, query)
+                if extracted is None:
+                    return
+                info, picked, key = extracted
+                title, uploader = info["title"], info["uploader"]
+
+            # pinned before it is even downloaded, so it can't be evicted before it is sent,
+            # not even for the callers that wait for someone else's download
+            with self.download_cache.use(*key):
+                file_name = self.download_cache.get(*key)
+                if file_name is None:
+                    file_name = await self.download_once(
+                        ctx, msg, query, info, picked, key
+                    )
+                    if file_name is None:
+                        return
 
-            # check for query
-            if "entries" in info:
-                info = info["entries"][0]
-
-            # check if the file is bigger than 25MB
-            # TODO: This can mostly be removed, we can just check if the duration is bigger than 660 seconds (11 minutes aprox. 25MB)
-            if self.get_expected_file_size(info["duration"]) > 25 * 1024 * 1024:
-                self.bot.create_task(msg.edit(content=self.t("err", "file_too_big")))
-                return
-
-            # check if the /tmp folder is bigger than 1GB, if it is, wait 5 seconds and try again
-            if self.get_tmp_size() > 1024 * 1024 * 1024:
-                total_time = 0
-                await msg.edit(
-                    content=self.t("cmd", "too_many_downloads", time=total_time)
-                )
-                while self.get_tmp_size() > 1024 * 1024 * 1024:
-                    await asyncio.sleep(5)
-                    await msg.edit(
-                        content=self.t("cmd", "too_many_downloads", time=total_time)
+                # it can come from the cache of a guild with a bigger upload limit
+                if await aiofiles.os.path.getsize(file_name) > limit:
+                    self.bot.create_task(
+                        msg.edit(content=self.t("err", "file_too_big", ctx=ctx))
                     )
-                    total_time += 5
-                    if total_time > 60:
-                        self.bot.create_task(
-                            msg.edit(content=self.t("err", "too_many_downloads"))
+                    return
+                extension = os.path.splitext(file_name)[1]
+                await asyncio.gather(
+                    msg.edit(content=self.t("cmd", "sending", ctx=ctx)),
+                    ctx.send(
+                        file=discord.File(
+                            file_name,
+                            filename=sanitize_filename(title) + extension,
                         )
-                        return
+                    ),
+                )
+            self.download_picks.set((key[0], key[1], limit), (key, title, uploader))
 
-            # download the file
-            await asyncio.gather(
-                self.bot.loop.run_in_executor(
-                    None, self.ytdlp_download.download, [query]
-                ),
-                msg.edit(content=self.t("cmd", "downloading")),
+            self.bot.create_task(
+                msg.edit(
+                    content=self.t(
+                        "cmd",
+                        "finished",
+                        title=title,
+                        author=uploader,
+                        ctx=ctx,
+                    )
+                )
             )
 
-            self.bot.create_task(msg.edit(content=self.t("cmd", "sending")))
+    @staticmethod
+    def get_url_track(url: str) -> tuple[str, str] | None:
+        """The extractor and the id of a url without extracting anything, the way yt-dlp does it for its download archive.
+        The first call compiles the patterns of every extractor, it shouldn't run in the event loop.
 
-            # get the file name
-            file_name = self.ytdlp_download.prepare_filename(info)
+        Returns:
+            tuple[str, str] | None: The same as the `extractor_key` and `id` of its info, None if it isn't a url
+            or its id is only known after extracting it.
+        """
+        if not url.startswith(("https://", "http://")):
+            return None
+        for extractor in gen_extractor_classes():
+            if extractor.ie_key() == "Generic":
+                break
+            if extractor.suitable(url):
+                id = extractor.get_temp_id(url)
+                return (extractor.ie_key(), id) if id else None
+        return None
+
+    async def extract_download_info(
+        self, ctx: commands.Context, msg: discord.Message, query: str
+    ) -> tuple[dict, tuple[str, int | None, int], tuple[str, str, str]] | None:
+        """Extracts the info of the query and picks the format to download.
 
-            # change whatever extension is to .mp3
-            last_dot_index = file_name.rfind(".")
-            file_extension = file_name[last_dot_index:]
-            file_name = file_name.replace(file_extension, ".mp3")
+        Returns:
+            tuple[dict, tuple[str, int | None, int], tuple[str, str, str]] | None: The info, what `pick_download_format`
+            returned and the cache key. None if it can't be downloaded (the message says why).
+        """
+        try:
+            info = await self.bot.ytdlp_pool.extract_info(
+                self.ytdlp_download_opts, query
+            )
+        except YTDLPPoolFull:
+            self.bot.create_task(
+                msg.edit(content=self.t("err", "too_many_downloads", ctx=ctx))
+            )
+            return None
+        except (DownloadError, TimeoutError) as e:
+            self.log(30, f"Couldn't get the info of {query}: {e!r}")
+            info = None
+
+        # check for query
+        if info is not None and "entries" in info:
+            info = info["entries"][0] if info["entries"] else None
+        # with ignoreerrors yt-dlp returns None instead of raising
+        if info is None:
+            self.bot.create_task(msg.edit(content=self.t("err", "failed", ctx=ctx)))
+            return None
+
+        picked = self.pick_download_format(
+            info, ctx.guild.filesize_limit, self.download_transcode
+        )
+        if picked is None:
+            self.bot.create_task(
+                msg.edit(content=self.t("err", "file_too_big", ctx=ctx))
+            )
+            return None
+        format_id, kbps, _ = picked
 
-            # send the file
-            self.bot.create_task(ctx.send(file=discord.File(file_name)))
+        format = format_id
+        if kbps is not None:
+            format += f"-{'mp3' if self.download_transcode else 'opus'}{kbps}"
+        return info, picked, (info["extractor_key"], info["id"], format)
 
+    async def download_once(
+        self,
+        ctx: commands.Context,
+        msg: discord.Message,
+        query: str,
+        info: dict,
+        picked: tuple[str, int | None, int],
+        key: tuple[str, str, str],
+    ) -> str | None:
+        """`download_to_cache` but the same track is often downloaded by several people at once, it is only downloaded once.
+
+        Returns:
+            str | None: The path of the file, None if it can't be sent (the message says why).
+        """
+        try:
+            file_name = await self.inflight.do(
+                ("download", *key),
+                self.download_to_cache,
+                ctx,
+                msg,
+                info,
+                query,
+                key,
+                picked,
+            )
+        except (DownloadQueueFull, YTDLPPoolFull):
             self.bot.create_task(
-                msg.edit(
-                    content=self.t(
-                        "cmd", "finished", title=info["title"], author=info["uploader"]
+                msg.edit(content=self.t("err", "too_many_downloads", ctx=ctx))
+            )
+            return None
+        except (DownloadError, TimeoutError) as e:
+            self.log(30, f"Couldn't download {info.get('webpage_url', query)}: {e!r}")
+            self.bot.create_task(msg.edit(content=self.t("err", "failed", ctx=ctx)))
+            return None
+
+        if file_name is None:
+            self.bot.create_task(
+                msg.edit(content=self.t("err", "file_too_big", ctx=ctx))
+            )
+        return file_name
+
+    async def download_to_cache(
+        self,
+        ctx: commands.Context,
+        msg: discord.Message,
+        info: dict,
+        query: str,
+        key: tuple[str, str, str],
+        picked: tuple[str, int | None, int],
+    ) -> str | None:
+        """Downloads the track once there is space for it and moves it into the cache.
+        `picked` is what `pick_download_format` returned, only the message of the first caller shows the progress.
+
+        Raises:
+            DownloadQueueFull: There are too many downloads waiting or it waited for longer than `download_max_wait`.
+            YTDLPPoolFull: There are too many downloads running.
+            DownloadError: yt-dlp couldn't download it.
+            TimeoutError: The download took too long.
+
+        Returns:
+            str | None: The path of the file, None if it turned out bigger than the upload limit.
+        """
+        format_id, kbps, expected_size = picked
+        reservation = self.downloads.reserve(ctx.guild.id, expected_size)
+        # every download has its own directory, the partial files of two downloads of the same track can't collide
+        directory = os.path.join(self.download_cache.partial, uuid.uuid4().hex)
+        try:
+            if not await self.wait_for_download(ctx, reservation, msg):
+                raise DownloadQueueFull(
+                    f"Waited for more than {self.download_max_wait} seconds."
+                )
+
+            downloaded, _ = await asyncio.gather(
+                self.bot.ytdlp_pool.download(
+                    self.get_download_opts(self.download_transcode, format_id, kbps),
+                    info.get("webpage_url", query),
+                    directory,
+                ),
+                msg.edit(content=self.t("cmd", "downloading", ctx=ctx)),
+            )
+            # with ignoreerrors yt-dlp returns None instead of raising
+            if downloaded is None:
+                raise DownloadError("yt-dlp couldn't download it.")
+
+            # the path after the audio was extracted
+            file_name = downloaded["requested_downloads"][0]["filepath"]
+            size = await aiofiles.os.path.getsize(file_name)
+            reservation.written(size)
+            # the sizes of the formats are estimates, a file that can't be sent isn't kept
+            if size > ctx.guild.filesize_limit:
+                return None
+            # from now on its space is counted by the cache
+            return await self.download_cache.add(file_name, *key)
+        finally:
+            reservation.release()
+            # whatever a failed download left behind
+            await asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+
+    async def wait_for_download(
+        self, ctx: commands.Context, reservation: Reservation, msg: discord.Message
+    ) -> bool:
+        """Wait for the download to be admitted, showing its place in the queue.
+        Other commands run in the meantime, the translations need the context.
+
+        Returns:
+            bool: Whether it was admitted, False if it waited for longer than `download_max_wait`.
+        """
+        deadline = self.bot.loop.time() + self.download_max_wait
+        position = 0
+        while not reservation.admitted:
+            remaining = deadline - self.bot.loop.time()
+            if remaining <= 0:
+                return False
+            if reservation.position != position:
+                position = reservation.position
+                self.bot.create_task(
+                    msg.edit(
+                        content=self.t("cmd", "queued", position=position, ctx=ctx)
                     )
                 )
+            await reservation.wait(remaining)
+        return True
+
+    @staticmethod
+    def _get_filtered_song(song: str) -> str:
+        """Removes the words and the brackets that YouTube titles have but genius.com titles don't."""
+        song = re.sub(r"(?i)\b(official|video|lyrics|audio)\b", "", song)
+        # remove everything between brackets and parenthesis including them
+        song = re.sub(r"[\(\[].*?[\)\]]", "", song)
+        return " ".join(song.split())
+
+    async def get_lyrics(self, query: str) -> tuple[str, str] | None:
+        cached = await self.lyrics_cache.get(query)
+        if cached is not None:
+            return cached
+
+        result = await self.inflight.do(
+            ("lyrics", LyricsCache.normalize(query)),
+            self.genius_lyrics.get_lyrics,
+            query,
+        )
+        if result is not None:
+            self.bot.create_task(self.lyrics_cache.set(query, *result))
+        return result
+
+    @staticmethod
+    def split_lyrics(lyrics: str, max_length: int = 2000) -> list[str]:
+        """Splits the lyrics in pages of at most `max_length` characters without cutting lines."""
+        pages = []
+        page: list[str] = []
+        length = 0
+        for line in lyrics.splitlines():
+            if length + len(line) + 1 > max_length and page:
+                pages.append("\n".join(page))
+                page = []
+                length = 0
+            page.append(line[:max_length])
+            length += len(line) + 1
+        if page:
+            pages.append("\n".join(page))
+        return pages
+
+    @commands.hybrid_command(aliases=["letras", "letra"])
+    async def lyrics(
+        self, ctx: commands.Context, *, song: Optional[str] = None
+    ) -> None:
+        player = cast(wavelink.Player, ctx.voice_client)
+        if not song:
+            if not player or not player.current:
+                await ctx.send(self.t("err", "nothing_to_search"))
+                return
+            song = self._get_filtered_song(player.current.title)
+
+        async with ctx.typing():
+            msg = await ctx.send(self.t("cmd", "searching_lyrics", query=song))
+            try:
+                result = await self.get_lyrics(song)
+            except SongNotFound:
+                self.bot.create_task(msg.edit(content=self.t("err", "song_not_found")))
+                return
+
+        if result is None:
+            self.bot.create_task(
+                msg.edit(content=self.t("err", "no_lyrics", query=song))
             )
-            self.bot.create_task(aiofiles.os.remove(file_name))
+            return
+
+        lyrics, lyrics_url = result
+        embeds = []
+        for page in self.split_lyrics(lyrics):
+            embed = discord.Embed(title=song, url=lyrics_url, description=page)
+            embed.set_footer(text="genius.com")
+            embeds.append(embed)
+
+        self.bot.create_task(msg.delete())
+        await Paginator.Simple().start(ctx, pages=embeds)
 
     # TODO: actually implement this
     @commands.hybrid_command(
@@ -1206,10 +1887,138 @@ class Music(commands.Cog):
         embed.set_thumbnail(url=track.artwork)
         await ctx.send(embed=embed)
 
+    @commands.Cog.listener()
+    async def on_ready(self) -> None:
+        await self.maybe_restore_queues()
+
+    async def maybe_restore_queues(self) -> None:
+        """Restores the queues once, when the bot is ready and a wavelink node is connected.
+        Lavalink usually restarts with the bot and can be ready after it, on_wavelink_node_ready calls this again.
+        """
+        # on_ready is also dispatched when the bot reconnects
+        if self.queues_restored or self.queues_restoring or not self.bot.is_ready():
+            return
+        try:
+            CritNode.best()
+        except wavelink.InvalidNodeException:
+            return
+
+        self.queues_restoring = True
+        try:
+            await self.restore_queues()
+        except Exception as e:
+            self.log(
+                40,
+                f"Failed to restore the queues, trying again on the next node ready: {e}",
+            )
+        else:
+            self.queues_restored = True
+        finally:
+            self.queues_restoring = False
+
+    async def restore_queues(self) -> None:
+        """Reconnect the players that were saved when the bot stopped and continue where they were."""
+        for record in await self.queue_store.load():
+            guild = self.bot.get_guild(record["guild_id"])
+            channel = guild and guild.get_channel(record["channel_id"])
+            text_channel = guild and guild.get_channel(record["text_channel_id"])
+            # there is no point in rejoining an empty channel
+            if (
+                channel is None
+                or text_channel is None
+                or guild.voice_client is not None
+                or not any(not member.bot for member in channel.members)
+            ):
+                await self.queue_store.delete(record["guild_id"])
+                continue
+
+            self.bot.create_task(
+                self.restore_queue(record, channel, text_channel)  # type: ignore
+            )
+
+    async def restore_queue(
+        self,
+        record,
+        channel: discord.VoiceChannel,
+        text_channel: discord.TextChannel,
+    ) -> None:
+        current, tracks = QueueStore.restore_tracks(record)
+        player = await channel.connect(self_deaf=True, cls=CritPlayer)
+        player.ctx = RestoredContext(self.bot, text_channel)
+        await self.send_sponsorblock_categories(player)
+
+        player.queue.put(tracks)
+        player.autoplay = wavelink.AutoPlayMode(record["autoplay"])
+        player.on_change = self.queue_store.mark
+
+        filters = (
+            wavelink.Filters(data=orjson.loads(record["filters"]))
+            if record["filters"]
+            else None
+        )
+        if current is not None:
+            await player.play(
+                current.to_playable(),
+                start=record["position"],
+                volume=record["volume"],
+                filters=filters,
+            )
+        elif player.queue:
+            await player.play(
+                player.queue.get(), volume=record["volume"], filters=filters
+            )
+
+        self.bot.i18n.guild_id = channel.guild.id
+        await text_channel.send(
+            self.t(
+                "cmd",
+                "output",
+                length=len(player.queue),
+                mcommand_name="queue_restored",
+                mcog_name="music",
+            )
+        )
+
+    def cache_stats(self) -> dict[str, dict[str, int | float]]:
+        """The stats of the caches of the cog, for the dev caches command."""
+        return {
+            "search": self.search_cache.stats,
+            "downloads": self.download_cache.stats,
+            "track info": {
+                **self.track_info_cache.stats,
+                "coalesced": self.inflight.coalesced,
+            },
+        }
+
+    def players(self) -> list[CritPlayer]:
+        return [
+            player
+            for player in self.bot.voice_clients
+            if isinstance(player, CritPlayer) and player.connected
+        ]
+
+    @tasks.loop(seconds=15.0)
+    async def save_queues(self) -> None:
+        """Saves the players that changed since the last time and where the others are in their tracks."""
+        # an exception would stop the loop for good, the players that weren't saved are saved on the next one
+        try:
+            await self.queue_store.save(self.players())
+        except Exception as e:
+            self.log(40, f"Failed to save the queues: {e}")
+
     async def cog_load(self) -> None:
+        await asyncio.gather(
+            self.track_metadata.purge_stale(), self.download_cache.load()
+        )
+        self.save_queues.start()
         print("Loaded {name} cog!".format(name=self.__class__.__name__))
 
     async def cog_unload(self) -> None:
+        # the cogs are unloaded when the bot closes, before the players are disconnected
+        self.save_queues.cancel()
+        for player in self.players():
+            self.queue_store.mark(player)
+        await self.queue_store.save()
         print("Unloaded {name} cog!".format(name=self.__class__.__name__))
 
 
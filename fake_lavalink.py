@@ -0,0 +1,200 @@
+"""A stand-in for Lavalink, to try the node placement and the failover of Utils/CritNode.py without running a JVM per node.
+
+It speaks enough of Lavalink's v4 API for wavelink to connect, create players and send requests about them,
+it doesn't play anything. The load it reports in its stats is set with the arguments, e.g. two of them:
+
+    python3 fake_lavalink.py --port 2334
+    python3 fake_lavalink.py --port 2335 --cpu 0.9 --deficit 300
+
+and add them to `lavalink_nodes` in appsettings.yaml, the new players should go to the first one.
+Stop it (Ctrl+C) and its players should move to the other one, `nodes` (a dev command) shows how many each node has.
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+
+from aiohttp import WSMsgType, web
+
+
+class FakeLavalink:
+    __slots__ = ("args", "session_id", "started_at", "players")
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.session_id = secrets.token_hex(8)
+        self.started_at = time.time()
+        # guild id: player
+        self.players: dict[str, dict] = {}
+
+    def authorized(self, request: web.Request) -> bool:
+        return request.headers.get("Authorization") == self.args.password
+
+    def stats(self) -> dict:
+        playing = sum(1 for player in self.players.values() if player["track"])
+        return {
+            "players": len(self.players),
+            "playingPlayers": playing,
+            "uptime": int((time.time() - self.started_at) * 1000),
+            "memory": {
+                "free": 256 * 1024 * 1024,
+                "used": 128 * 1024 * 1024,
+                "allocated": 384 * 1024 * 1024,
+                "reservable": 1024 * 1024 * 1024,
+            },
+            "cpu": {
+                "cores": 4,
+                "systemLoad": self.args.cpu,
+                "lavalinkLoad": self.args.cpu / 2,
+            },
+            "frameStats": {
+                "sent": 3000 - self.args.deficit,
+                "nulled": self.args.nulled,
+                "deficit": self.args.deficit,
+            }
+            if playing
+            else None,
+        }
+
+    async def websocket(self, request: web.Request) -> web.StreamResponse:
+        if not self.authorized(request):
+            raise web.HTTPUnauthorized()
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_json(
+            {"op": "ready", "resumed": False, "sessionId": self.session_id}
+        )
+
+        async def send_stats() -> None:
+            while not ws.closed:
+                await ws.send_json({"op": "stats", **self.stats()})
+                await asyncio.sleep(self.args.stats_interval)
+
+        task = asyncio.create_task(send_stats())
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            task.cancel()
+        return ws
+
+    async def info(self, _request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "version": {
+                    "semver": "4.0.0",
+                    "major": 4,
+                    "minor": 0,
+                    "patch": 0,
+                    "preRelease": None,
+                    "build": None,
+                },
+                "buildTime": 0,
+                "git": {"branch": "fake", "commit": "fake", "commitTime": 0},
+                "jvm": "none",
+                "lavaplayer": "none",
+                "sourceManagers": [],
+                "filters": [],
+                "plugins": [],
+            }
+        )
+
+    async def get_stats(self, _request: web.Request) -> web.Response:
+        # like Lavalink, the frames are only sent through the websocket
+        return web.json_response({**self.stats(), "frameStats": None})
+
+    def player(self, guild_id: str) -> dict:
+        return self.players.setdefault(
+            guild_id,
+            {
+                "guildId": guild_id,
+                "track": None,
+                "volume": 100,
+                "paused": False,
+                "state": {"time": 0, "position": 0, "connected": True, "ping": 0},
+                "voice": {"token": "", "endpoint": "", "sessionId": ""},
+                "filters": {},
+            },
+        )
+
+    async def update_player(self, request: web.Request) -> web.Response:
+        player = self.player(request.match_info["guild_id"])
+        data = await request.json()
+        if "track" in data:
+            encoded = data["track"].get("encoded")
+            player["track"] = {"encoded": encoded} if encoded else None
+        for key in ("volume", "paused", "filters", "voice"):
+            if key in data:
+                player[key] = data[key]
+        return web.json_response(player)
+
+    async def destroy_player(self, request: web.Request) -> web.Response:
+        self.players.pop(request.match_info["guild_id"], None)
+        return web.Response(status=204)
+
+    async def update_session(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        return web.json_response(
+            {
+                "resuming": data.get("resuming", False),
+                "timeout": data.get("timeout", 60),
+            }
+        )
+
+    async def no_content(self, _request: web.Request) -> web.Response:
+        return web.Response(status=204)
+
+    async def load_tracks(self, _request: web.Request) -> web.Response:
+        return web.json_response({"loadType": "empty", "data": {}})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        player = "/v4/sessions/{session_id}/players/{guild_id}"
+        app.add_routes(
+            [
+                web.get("/v4/websocket", self.websocket),
+                web.get("/v4/info", self.info),
+                web.get("/v4/stats", self.get_stats),
+                web.get("/v4/loadtracks", self.load_tracks),
+                web.patch("/v4/sessions/{session_id}", self.update_session),
+                web.patch(player, self.update_player),
+                web.delete(player, self.destroy_player),
+                web.put(player + "/sponsorblock/categories", self.no_content),
+            ]
+        )
+        return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="A stand-in for Lavalink.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=2334)
+    parser.add_argument("--password", default="")
+    parser.add_argument(
+        "--cpu", type=float, default=0.1, help="The system load it reports, 0 to 1."
+    )
+    parser.add_argument(
+        "--deficit",
+        type=int,
+        default=0,
+        help="The frames missing per player per minute.",
+    )
+    parser.add_argument(
+        "--nulled", type=int, default=0, help="The nulled frames per player per minute."
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=60.0,
+        help="Seconds between the stats, Lavalink sends them every minute.",
+    )
+    args = parser.parse_args()
+
+    web.run_app(FakeLavalink(args).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
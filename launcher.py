@@ -83,8 +83,9 @@ async def start_bot(dev: bool) -> None:
             f"cogs.{file[:-3]}" for file in os.listdir("./cogs") if file.endswith(".py")
         ]
 
-        # Apply migrations
+        # Apply migrations, in order of their version (V<version>__<name>.sql)
         files = await aiofiles.os.listdir("./migrations")
+        files.sort(key=lambda file: int(file[1 : file.index("__")]))
         for file in files:
             async with aiofiles.open(f"./migrations/{file}", "r") as f:
                 migration = await f.read()
@@ -241,6 +242,7 @@ if __name__ == "__main__":
         print("Exiting...")
 
 
-else:
+# the yt-dlp worker processes are spawned and import this file as __mp_main__
+elif __name__ != "__mp_main__":
     print("This script is not meant to be imported! You little cunt")
     exit(1)
@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS track_metadata(
+    source VARCHAR(32),
+    identifier TEXT,
+    info JSONB NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY(source, identifier)
+);
+CREATE INDEX IF NOT EXISTS track_metadata_fetched_at_idx ON track_metadata(fetched_at);
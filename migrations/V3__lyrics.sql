@@ -0,0 +1,5 @@
+CREATE TABLE IF NOT EXISTS lyrics(
+    query TEXT PRIMARY KEY,
+    lyrics BYTEA NOT NULL,
+    url TEXT NOT NULL
+);
@@ -0,0 +1,12 @@
+CREATE TABLE IF NOT EXISTS queue_snapshots(
+    guild_id BIGINT PRIMARY KEY,
+    channel_id BIGINT NOT NULL,
+    text_channel_id BIGINT NOT NULL,
+    current JSONB,
+    position INTEGER NOT NULL DEFAULT 0,
+    tracks JSONB NOT NULL,
+    autoplay SMALLINT NOT NULL,
+    filters JSONB,
+    volume SMALLINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);